@@ -0,0 +1,102 @@
+"""Measures the event loop lag while large files are read through persistence.aio vs read blocking in the loop
+
+A ticker coroutine sleeps in short intervals and records how late it wakes up - the lag is the time
+the loop was blocked. The aio run (decoding and parsing in the process pool) fails if its 99th percentile
+lag exceeds MAX_P99_LAG (seconds). The max lag is only reported - it is the time the loop thread spends
+unpickling the largest result.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from timeit import default_timer as now
+
+from generators import make_json_payload, make_sheets
+from hed_utils.support.persistence import aio, excel_util, json_file
+
+JSON_FILES = 4
+
+PAYLOAD = dict(records=50000)
+
+WORKBOOK = dict(sheets=2, rows=5000, columns=10)
+
+TICK_INTERVAL = 0.001
+
+MAX_P99_LAG = 0.05
+
+
+async def _measure_lag(load) -> tuple:
+    """Runs the load coroutine next to a ticker and returns (load duration, max lag, p99 lag, ticks)"""
+
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = now() + TICK_INTERVAL
+            await asyncio.sleep(TICK_INTERVAL)
+            lags.append(max(0.0, now() - expected))
+
+    ticker_task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(TICK_INTERVAL)
+
+    start_time = now()
+    loaded = await load()
+    duration = now() - start_time
+
+    done.set()
+    await ticker_task
+    # the loaded values are released after the measurement
+    del loaded
+
+    lags.sort()
+    return duration, lags[-1], lags[int(len(lags) * 0.99)], len(lags)
+
+
+def bench_aio_latency(**payload_kwargs) -> dict:
+    payload = make_json_payload(**(payload_kwargs or PAYLOAD))
+    sheets = make_sheets(**WORKBOOK)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_files = [os.path.join(tmp_dir, f"payload_{index}.json") for index in range(JSON_FILES)]
+        for file in json_files:
+            json_file.write_json(payload, file)
+        workbook = excel_util.write_sheets(sheets, os.path.join(tmp_dir, "workbook.xlsx"))
+
+        async def blocking_load():
+            return [json_file.read_json(file) for file in json_files] + [excel_util.read_sheets(workbook)]
+
+        async def aio_load():
+            return await asyncio.gather(*[aio.read_json(file) for file in json_files],
+                                    aio.read_sheets(workbook, use_processes=True))
+
+        aio.configure(max_workers=4, max_open_files=8, process_workers=1)
+        try:
+            loop = asyncio.new_event_loop()
+            try:
+                # warm up the process pool (the worker start up is not the loop lag being measured)
+                loop.run_until_complete(aio.read_sheets(workbook, use_processes=True))
+                blocking = loop.run_until_complete(_measure_lag(blocking_load))
+                concurrent = loop.run_until_complete(_measure_lag(aio_load))
+            finally:
+                loop.close()
+        finally:
+            aio.shutdown()
+
+    if concurrent[2] > MAX_P99_LAG:
+        raise AssertionError(f"aio p99 loop lag {concurrent[2]:0.3f}s exceeds {MAX_P99_LAG}s")
+
+    return {
+        "blocking_duration": blocking[0],
+        "blocking_max_lag": blocking[1],
+        "blocking_p99_lag": blocking[2],
+        "aio_duration": concurrent[0],
+        "aio_max_lag": concurrent[1],
+        "aio_p99_lag": concurrent[2],
+        "aio_ticks": concurrent[3],
+    }
+
+
+if __name__ == "__main__":
+    for key, value in bench_aio_latency().items():
+        print(f"{key:<20} {value:0.4f}" if isinstance(value, float) else f"{key:<20} {value}", file=sys.stdout)
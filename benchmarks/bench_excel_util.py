@@ -0,0 +1,36 @@
+"""Measures the write_sheets/read_sheets throughput on a large synthetic workbook"""
+import os
+import sys
+import tempfile
+from timeit import default_timer as now
+
+from generators import make_sheets
+from hed_utils.support.persistence import excel_util
+
+WORKBOOK = dict(sheets=3, rows=20000, columns=10)
+
+
+def bench_sheets(**workbook_kwargs) -> dict:
+    workbook_kwargs = workbook_kwargs or WORKBOOK
+    sheets = make_sheets(**workbook_kwargs)
+    cells = sum(len(records) * len(records[0]) for records in sheets.values())
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start_time = now()
+        file = excel_util.write_sheets(sheets, os.path.join(tmp_dir, "workbook.xlsx"))
+        write_duration = now() - start_time
+
+        start_time = now()
+        excel_util.read_sheets(file)
+        read_duration = now() - start_time
+
+    return {
+        "write_sheets": write_duration,
+        "read_sheets": read_duration,
+        "cells": cells,
+    }
+
+
+if __name__ == "__main__":
+    for key, value in bench_sheets().items():
+        print(f"{key:<16} {value:0.3f}", file=sys.stdout)
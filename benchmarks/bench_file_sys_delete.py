@@ -0,0 +1,51 @@
+"""Compares file_sys.delete against the previous recursive Path based implementation"""
+import sys
+import tempfile
+from pathlib import Path
+from timeit import default_timer as now
+
+from generators import make_tree
+from hed_utils.support import log
+from hed_utils.support.persistence import file_sys
+
+TREE = dict(depth=4, width=6, files_per_dir=20)
+
+
+@log.call
+def legacy_delete(path):
+    path = (path if isinstance(path, Path) else Path(path)).absolute()
+
+    if not path.exists():
+        raise FileNotFoundError(str(path))
+
+    if path.is_file():
+        path.unlink()
+        return
+
+    if path.is_dir():
+        for child_path in path.iterdir():
+            legacy_delete(child_path)
+
+        path.rmdir()
+
+
+def _timed(delete_func, **tree_kwargs) -> float:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = make_tree(Path(tmp_dir).joinpath("tree"), **tree_kwargs)
+        start_time = now()
+        delete_func(root)
+        return now() - start_time
+
+
+def bench_delete(**tree_kwargs) -> dict:
+    tree_kwargs = tree_kwargs or TREE
+    return {
+        "legacy": _timed(legacy_delete, **tree_kwargs),
+        "scandir": _timed(file_sys.delete, **tree_kwargs),
+        "scandir_parallel_8": _timed(lambda root: file_sys.delete(root, workers=8), **tree_kwargs),
+    }
+
+
+if __name__ == "__main__":
+    for key, seconds in bench_delete().items():
+        print(f"{key:<24} {seconds:0.3f} s.", file=sys.stdout)
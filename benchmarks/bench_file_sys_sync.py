@@ -0,0 +1,58 @@
+"""Compares re-syncing a large tree after small changes: copy(overwrite=True) vs copy(sync=True)"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+from timeit import default_timer as now
+
+from generators import make_tree
+from hed_utils.support.persistence import file_sys
+
+TREE = dict(depth=3, width=6, files_per_dir=40, file_size=16 * 1024)
+
+
+def _touch_some(root: Path, every=50):
+    for index, path in enumerate(sorted(root.rglob("*.bin"))):
+        if index % every == 0:
+            with path.open("ab") as out:
+                out.write(b"changed")
+
+
+def bench_sync(**tree_kwargs) -> dict:
+    tree_kwargs = tree_kwargs or TREE
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src = make_tree(Path(tmp_dir).joinpath("src"), **tree_kwargs)
+        dst_copy, dst_sync = os.path.join(tmp_dir, "dst_copy"), os.path.join(tmp_dir, "dst_sync")
+
+        start_time = now()
+        file_sys.copy(str(src), dst_copy)
+        results["copytree_initial"] = now() - start_time
+
+        start_time = now()
+        file_sys.copy(str(src), dst_sync, sync=True)
+        results["sync_initial"] = now() - start_time
+
+        _touch_some(src)
+        os.unlink(os.path.join(dst_sync, "file_0001.bin"))
+
+        start_time = now()
+        file_sys.copy(str(src), dst_copy, overwrite=True)
+        results["copytree_overwrite_resync"] = now() - start_time
+
+        start_time = now()
+        report = file_sys.copy(str(src), dst_sync, sync=True)
+        results["sync_resync"] = now() - start_time
+        results["sync_resync_copied"] = report.copied
+
+        start_time = now()
+        file_sys.copy(str(src), dst_sync, sync=True, checksum=True)
+        results["sync_resync_checksum"] = now() - start_time
+
+    return results
+
+
+if __name__ == "__main__":
+    for key, value in bench_sync().items():
+        print(f"{key:<28} {value:0.3f}", file=sys.stdout)
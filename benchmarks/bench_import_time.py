@@ -0,0 +1,60 @@
+"""Measures the import time of the package entry points with `python -X importtime` and guards a budget
+
+Exits with a non zero status if any module exceeds its budget (the best of a few fresh interpreter runs is used).
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = str(Path(__file__).absolute().parent.parent.joinpath("src"))
+
+# cumulative import time budgets in milliseconds - mostly stdlib (logging, inspect, argparse) by now,
+# the eager pkg_resources/psutil/xlrd/xlwt/tabulate imports used to cost ~300 ms for the cli alone
+IMPORT_BUDGET_MS = {
+    "hed_utils": 20,
+    "hed_utils.support.log": 100,
+    "hed_utils.support.os_util": 130,
+    "hed_utils.cli.kill_all": 160,
+}
+
+
+def measure_import_ms(module: str, runs=5) -> float:
+    """Returns the best cumulative import time of the module (in ms) over the given number of fresh interpreters"""
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")])))
+    best = None
+
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                env=env, stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+
+        for line in output.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = [part.strip() for part in line.split("|")]
+            if len(parts) == 3 and parts[2] == module:
+                cumulative_ms = int(parts[1]) / 1000
+                best = cumulative_ms if best is None else min(best, cumulative_ms)
+
+    if best is None:
+        raise RuntimeError(f"{module} not found in the -X importtime output")
+
+    return best
+
+
+def bench_import_time() -> dict:
+    return {module: measure_import_ms(module) / 1000 for module in IMPORT_BUDGET_MS}
+
+
+def main() -> int:
+    failures = 0
+    for module, budget_ms in IMPORT_BUDGET_MS.items():
+        elapsed_ms = measure_import_ms(module)
+        status = "OK" if elapsed_ms <= budget_ms else "OVER BUDGET"
+        failures += status != "OK"
+        print(f"{module:<32} {elapsed_ms:8.2f} ms. (budget {budget_ms} ms.) {status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""Measures the write_json/read_json speed on a large synthetic payload"""
+import os
+import sys
+import tempfile
+from timeit import default_timer as now
+
+from generators import make_json_payload
+from hed_utils.support.persistence import json_file
+
+PAYLOAD = dict(records=100000)
+
+
+def bench_json(**payload_kwargs) -> dict:
+    payload = make_json_payload(**(payload_kwargs or PAYLOAD))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file = os.path.join(tmp_dir, "payload.json")
+
+        start_time = now()
+        json_file.write_json(payload, file)
+        write_duration = now() - start_time
+
+        start_time = now()
+        json_file.read_json(file)
+        read_duration = now() - start_time
+
+        size = os.path.getsize(file)
+
+    return {
+        "write_json": write_duration,
+        "read_json": read_duration,
+        "bytes": size,
+    }
+
+
+if __name__ == "__main__":
+    for key, value in bench_json().items():
+        print(f"{key:<12} {value:0.3f}", file=sys.stdout)
@@ -0,0 +1,52 @@
+"""Measures the per call overhead of the log.call decorator"""
+import logging
+import sys
+from timeit import default_timer as now
+
+from hed_utils.support import log
+
+CALLS = 20000
+
+
+def _target(a, b=2, *args, c=None, **kwargs):
+    return a
+
+
+def _timed(func, calls) -> float:
+    start_time = now()
+    for index in range(calls):
+        func(index, c="value", extra=[1, 2, 3])
+    return (now() - start_time) / calls
+
+
+def bench_log_call(calls=CALLS) -> dict:
+    logger = logging.getLogger(__name__)
+    decorated = log.call(_target)
+    decorated_no_result = log.call(_target, log_result=False, skip_args=["extra"])
+    decorated_memory = log.call(_target, profile_memory=True)
+
+    results = {
+        "plain_per_call": _timed(_target, calls),
+        "disabled_per_call": _timed(decorated, calls),
+    }
+
+    handler = logging.NullHandler()
+    old_level, old_propagate = logger.level, logger.propagate
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    try:
+        results["enabled_per_call"] = _timed(decorated, calls)
+        results["enabled_skip_args_per_call"] = _timed(decorated_no_result, calls)
+        results["enabled_profile_memory_per_call"] = _timed(decorated_memory, calls)
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(old_level)
+        logger.propagate = old_propagate
+
+    return results
+
+
+if __name__ == "__main__":
+    for key, seconds in bench_log_call().items():
+        print(f"{key:<32} {seconds * 1e6:0.3f} us.", file=sys.stdout)
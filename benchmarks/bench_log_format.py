@@ -0,0 +1,77 @@
+"""Measures the log output throughput (records/second) of the text layout vs the structured JSON one
+
+The records are produced by a log.call decorated function, so they carry the call fields, and are
+formatted into an in-memory stream (the JSON run with the short structured mode messages).
+"""
+import io
+import logging
+import sys
+from datetime import datetime
+from timeit import default_timer as now
+
+from hed_utils.support import log
+
+CALLS = 10000
+
+
+def _target(a, b=2, *args, c=None, **kwargs):
+    return [a, b, c]
+
+
+def _add_text_tags(record: logging.LogRecord) -> bool:
+    # what the log.init tag factories add for the text layout
+    record.indent = ""
+    record.utcnow = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+    return True
+
+
+def _timed(logger: logging.Logger, formatter: logging.Formatter, calls: int) -> tuple:
+    """Returns (seconds per record, records count) for logging the decorated calls with the formatter"""
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    handler.addFilter(_add_text_tags)
+    logger.addHandler(handler)
+
+    decorated = log.call(_target, name=logger.name)
+    try:
+        start_time = now()
+        for index in range(calls):
+            decorated(index, c="value", extra=[1, 2, 3])
+        duration = now() - start_time
+    finally:
+        logger.removeHandler(handler)
+
+    records = stream.getvalue().count("\n")
+    return duration / records, records
+
+
+def bench_log_format(calls=CALLS) -> dict:
+    logger = logging.getLogger(__name__)
+    old_level, old_propagate = logger.level, logger.propagate
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    try:
+        text_per_record, records = _timed(logger, logging.Formatter(log.PREFIX_UTC + log.LOGGER_FMT), calls)
+        # what log.init(structured=True) switches on next to the JsonFormatter
+        log._structured = True
+        json_per_record, _ = _timed(logger, log.JsonFormatter(), calls)
+    finally:
+        log._structured = False
+        logger.setLevel(old_level)
+        logger.propagate = old_propagate
+
+    return {
+        "text_per_record": text_per_record,
+        "json_per_record": json_per_record,
+        "text_records_per_second": int(1 / text_per_record),
+        "json_records_per_second": int(1 / json_per_record),
+        "records": records,
+    }
+
+
+if __name__ == "__main__":
+    for key, value in bench_log_format().items():
+        print(f"{key:<24} {value * 1e6:0.3f} us." if isinstance(value, float) else f"{key:<24} {value}",
+              file=sys.stdout)
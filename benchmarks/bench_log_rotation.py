@@ -0,0 +1,86 @@
+"""Measures the write latency while logging at a high rate to a small rotating (and compressing) log file
+
+Every record carries a sequence number. After the handler is closed (waiting for the pending compressions)
+all the segments are read back - the run fails if any record was lost or if the max write latency
+exceeds MAX_WRITE_LATENCY (seconds).
+"""
+import gzip
+import logging
+import os
+import sys
+import tempfile
+from timeit import default_timer as now
+
+from hed_utils.support.log_rotation import CompressingRotatingFileHandler
+
+RECORDS = 50000
+
+MAX_BYTES = 256 * 1024
+
+MAX_WRITE_LATENCY = 0.1
+
+PADDING = "x" * 100
+
+
+def _read_records(handler: CompressingRotatingFileHandler) -> list:
+    lines = []
+    for segment in handler.segments() + [handler.baseFilename]:
+        opener = gzip.open if segment.endswith(".gz") else open
+        with opener(segment, "rt", encoding="utf-8") as in_file:
+            lines.extend(in_file.read().splitlines())
+    return lines
+
+
+def bench_log_rotation(records=RECORDS) -> dict:
+    logger = logging.getLogger(__name__)
+    old_level, old_propagate = logger.level, logger.propagate
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        handler = CompressingRotatingFileHandler(os.path.join(tmp_dir, "bench.log"), max_bytes=MAX_BYTES)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+
+        latencies = []
+        try:
+            start_time = now()
+            for index in range(records):
+                write_start = now()
+                logger.info("%d %s", index, PADDING)
+                latencies.append(now() - write_start)
+            duration = now() - start_time
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(old_level)
+            logger.propagate = old_propagate
+
+        close_start = now()
+        handler.close()
+        close_duration = now() - close_start
+
+        segments = handler.segments()
+        lines = _read_records(handler)
+
+    sequence = [int(line.split(" ", 1)[0]) for line in lines]
+    if sequence != list(range(records)):
+        raise AssertionError(f"lost or reordered records: wrote {records}, read {len(sequence)}")
+
+    latencies.sort()
+    if latencies[-1] > MAX_WRITE_LATENCY:
+        raise AssertionError(f"max write latency {latencies[-1]:0.3f}s exceeds {MAX_WRITE_LATENCY}s")
+
+    return {
+        "write_per_record": duration / records,
+        "max_write_latency": latencies[-1],
+        "p99_write_latency": latencies[int(len(latencies) * 0.99)],
+        "close_duration": close_duration,
+        "segments": len(segments),
+        "compressed_segments": sum(1 for segment in segments if segment.endswith(".gz")),
+        "records": len(sequence),
+    }
+
+
+if __name__ == "__main__":
+    for key, value in bench_log_rotation().items():
+        print(f"{key:<20} {value:0.6f}" if isinstance(value, float) else f"{key:<20} {value}", file=sys.stdout)
@@ -0,0 +1,40 @@
+"""Measures building a directory manifest and updating it after a few changes"""
+import sys
+import tempfile
+from pathlib import Path
+from timeit import default_timer as now
+
+from generators import make_tree
+from hed_utils.support.persistence import manifest
+
+TREE = dict(depth=3, width=6, files_per_dir=40, file_size=16 * 1024)
+
+
+def bench_manifest(**tree_kwargs) -> dict:
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = make_tree(Path(tmp_dir).joinpath("tree"), **(tree_kwargs or TREE))
+        manifest_file = str(Path(tmp_dir).joinpath("tree.manifest.jsonl"))
+
+        start_time = now()
+        report = manifest.build_manifest(root, manifest_file)
+        results["build_manifest"] = now() - start_time
+        results["files"] = report.files
+
+        for index, path in enumerate(sorted(root.rglob("*.bin"))):
+            if index % 100 == 0:
+                with path.open("ab") as out:
+                    out.write(b"changed")
+
+        start_time = now()
+        report = manifest.update_manifest(root, manifest_file)
+        results["update_manifest"] = now() - start_time
+        results["rehashed"] = report.hashed
+
+    return results
+
+
+if __name__ == "__main__":
+    for key, value in bench_manifest().items():
+        print(f"{key:<16} {value:0.3f}", file=sys.stdout)
@@ -0,0 +1,113 @@
+"""Process tree benchmarks for os_util: collecting the victims and tearing down trees that ignore SIGTERM"""
+import sys
+from collections import Counter
+import tempfile
+from timeit import default_timer as now
+
+import psutil
+
+from generators import spawn_process_tree
+from hed_utils.support import log, os_util
+
+TREE = dict(depth=3, width=7)
+
+
+@log.call(skip_args=["victims"], log_result=False)
+def legacy_rkill(process: psutil.Process, *, dry=True):
+    victims = []
+
+    if process.is_running():
+
+        with process.oneshot():
+
+            ppid = process.ppid()
+            pid = process.pid
+            name = process.name()
+
+        for child_process in process.children(recursive=True):
+            victims.extend(legacy_rkill(child_process, dry=dry))
+
+        victims.append(os_util.KillVictim(ppid, pid, name, "SKIPPED", None))
+
+    return victims
+
+
+def bench_kill_scan(**tree_kwargs) -> dict:
+    tree_kwargs = tree_kwargs or TREE
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = spawn_process_tree(tmp_dir, **tree_kwargs)
+        try:
+            start_time = now()
+            legacy_victims = legacy_rkill(psutil.Process(root.pid), dry=True)
+            results["legacy_rkill_dry"] = now() - start_time
+
+            start_time = now()
+            victims = os_util.kill_process_by_pid(root.pid, dry=True)
+            results["process_table_dry"] = now() - start_time
+
+            results["legacy_victims"] = len(legacy_victims)
+            results["victims"] = len(victims)
+
+            start_time = now()
+            os_util.ProcessTable.snapshot()
+            results["snapshot"] = now() - start_time
+        finally:
+            os_util.kill_process_by_pid(root.pid, dry=False)
+            root.wait()
+
+    return results
+
+
+def bench_kill_sigterm_ignored(depth=2, width=7, timeout=1) -> dict:
+    """All the processes ignore SIGTERM - each one has to be escalated to kill after the shared timeout"""
+
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = spawn_process_tree(tmp_dir, depth=depth, width=width, ignore_sigterm=True)
+        try:
+            start_time = now()
+            victims = os_util.kill_process_by_pid(root.pid, dry=False, timeout=timeout)
+            results["kill_duration"] = now() - start_time
+        finally:
+            root.wait()
+
+    statuses = Counter(victim.status for victim in victims)
+    if statuses["KILLED"] != len(victims):
+        raise AssertionError(f"expected all victims to be KILLED: {statuses}")
+
+    results["victims"] = len(victims)
+    results["max_time_to_exit"] = max(victim.elapsed for victim in victims)
+    return results
+
+
+def bench_table_enumeration(depth=3, width=7, rounds=5) -> dict:
+    """Full process table enumeration (with the attrs used by the matchers) - psutil vs the /proc fast path"""
+
+    results = dict()
+    attrs = ["cmdline", "create_time"]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = spawn_process_tree(tmp_dir, depth=depth, width=width)
+        try:
+            backends = ["psutil"] + (["proc"] if os_util.IS_LINUX else [])
+            for backend in backends:
+                for key, backend_attrs in ((backend, ()), (f"{backend}_cmdline_create_time", attrs)):
+                    start_time = now()
+                    for _ in range(rounds):
+                        table = os_util.ProcessTable.snapshot(backend_attrs, backend=backend)
+                    results[key] = (now() - start_time) / rounds
+            results["processes"] = len(table)
+        finally:
+            os_util.kill_process_by_pid(root.pid, dry=False)
+            root.wait()
+
+    return results
+
+
+if __name__ == "__main__":
+    for bench in (bench_kill_scan, bench_kill_sigterm_ignored, bench_table_enumeration):
+        for key, value in bench().items():
+            print(f"{bench.__name__}.{key:<24} {value:0.3f}", file=sys.stdout)
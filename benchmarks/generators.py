@@ -0,0 +1,133 @@
+"""Synthetic data generators shared by the benchmarks"""
+import os
+import random
+import string
+from pathlib import Path
+
+
+def make_tree(root, *, depth=4, width=6, files_per_dir=20, file_size=64) -> Path:
+    """Creates a deep/wide directory tree of small files under root and returns the root path
+
+    The total file count is files_per_dir * (width ** (depth + 1) - 1) / (width - 1)
+    """
+
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    payload = os.urandom(file_size)
+
+    pending = [(root, 0)]
+    while pending:
+        dir_path, level = pending.pop()
+        for file_index in range(files_per_dir):
+            with open(os.path.join(dir_path, f"file_{file_index:04d}.bin"), "wb") as out:
+                out.write(payload)
+
+        if level < depth:
+            for dir_index in range(width):
+                child = dir_path.joinpath(f"dir_{dir_index:03d}")
+                child.mkdir()
+                pending.append((child, level + 1))
+
+    return root
+
+
+def _random_text(rnd: random.Random, size: int) -> str:
+    return "".join(rnd.choice(string.ascii_letters) for _ in range(size))
+
+
+def make_sheets(*, sheets=3, rows=20000, columns=10, seed=0) -> dict:
+    """Returns workbook data in the excel_util.write_sheets format: { sheet name: [ records ] }
+
+    Every record has a mix of int, float and str columns (xls sheets are limited to 65535 records).
+    """
+
+    rnd = random.Random(seed)
+    result = dict()
+
+    for sheet_index in range(sheets):
+        records = []
+        for row_index in range(rows):
+            record = dict()
+            for column_index in range(columns):
+                kind = column_index % 3
+                if kind == 0:
+                    record[f"int_{column_index}"] = row_index * columns + column_index
+                elif kind == 1:
+                    record[f"float_{column_index}"] = rnd.random() * 1000
+                else:
+                    record[f"text_{column_index}"] = _random_text(rnd, 12)
+            records.append(record)
+        result[f"sheet_{sheet_index}"] = records
+
+    return result
+
+
+def make_json_payload(*, records=100000, seed=0) -> dict:
+    """Returns a JSON serializable payload of nested records (~15 MB of JSON for the default size)"""
+
+    rnd = random.Random(seed)
+    return {
+        "name": "payload",
+        "records": [
+            {
+                "id": index,
+                "score": rnd.random(),
+                "active": bool(index % 2),
+                "label": _random_text(rnd, 16),
+                "tags": [_random_text(rnd, 6) for _ in range(3)],
+                "nested": {"x": rnd.randint(0, 1 << 30), "y": None, "z": [1.5, "two", 3]},
+            }
+            for index in range(records)
+        ],
+    }
+
+
+_PROCESS_TREE_SCRIPT = """
+[ "$3" = "1" ] && trap '' TERM
+if [ "$1" -gt 0 ]; then
+    i=0
+    while [ "$i" -lt "$2" ]; do
+        sh "$0" "$(($1 - 1))" "$2" "$3" &
+        i=$((i + 1))
+    done
+    wait
+else
+    exec sleep 600
+fi
+"""
+
+
+def spawn_process_tree(script_dir, *, depth=3, width=7, ignore_sigterm=False, timeout=30):
+    """Spawns a local tree of dummy shell/sleep processes and returns the root Popen once all of them are running
+
+    The tree has sum(width ** level for level in range(depth + 1)) processes (400 for the defaults).
+    With ignore_sigterm=True every process in the tree ignores SIGTERM (ignored signals survive exec).
+    A tree not ready within the timeout is killed before the TimeoutError is raised.
+    """
+
+    import subprocess
+    import time
+
+    import psutil
+
+    script = os.path.join(script_dir, "process_tree.sh")
+    with open(script, "w") as out:
+        out.write(_PROCESS_TREE_SCRIPT)
+
+    root = subprocess.Popen(["sh", script, str(depth), str(width), "1" if ignore_sigterm else "0"],
+                            stdin=subprocess.DEVNULL)
+    expected = sum(width ** level for level in range(depth + 1))
+    deadline = time.monotonic() + timeout
+
+    while len(psutil.Process(root.pid).children(recursive=True)) + 1 < expected:
+        if time.monotonic() > deadline:
+            for process in psutil.Process(root.pid).children(recursive=True) + [psutil.Process(root.pid)]:
+                try:
+                    process.kill()
+                except psutil.NoSuchProcess:
+                    pass
+            root.wait()
+            raise TimeoutError(f"process tree not ready in {timeout}s")
+        time.sleep(0.05)
+
+    return root
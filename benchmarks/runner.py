@@ -0,0 +1,192 @@
+"""Runs the benchmark suite, records the results with the machine metadata and compares them against a baseline
+
+Every bench_*.py module next to this file is a benchmark module and every bench_* function in it
+is a benchmark returning a dict of metrics. Float metrics are durations in seconds (lower is better)
+and are the ones compared, int metrics are informational counts.
+
+Usage:
+    python benchmarks/runner.py run [-k FILTER] [--repeat N] [--output FILE]
+    python benchmarks/runner.py compare BASELINE [CURRENT] [-k FILTER] [--repeat N] [--threshold RATIO]
+
+compare runs the suite when CURRENT is not given and exits with status 1 if any duration
+got slower than the baseline by more than the threshold (0.2 = 20% by default).
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+BENCHMARKS_DIR = Path(__file__).absolute().parent
+
+SRC_DIR = BENCHMARKS_DIR.parent.joinpath("src")
+
+DEFAULT_THRESHOLD = 0.2
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=str(BENCHMARKS_DIR), stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def get_machine_metadata() -> dict:
+    metadata = {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "git_revision": _git_revision(),
+        "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+    try:
+        import psutil
+        metadata["memory_total"] = psutil.virtual_memory().total
+    except ImportError:
+        pass
+
+    return metadata
+
+
+def discover(name_filter: str = None) -> Dict[str, callable]:
+    """Returns { 'module.function': benchmark } for all the benchmarks (whose name contains the filter)"""
+
+    for path in (str(BENCHMARKS_DIR), str(SRC_DIR)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    benchmarks = dict()
+    for module_path in sorted(BENCHMARKS_DIR.glob("bench_*.py")):
+        module = importlib.import_module(module_path.stem)
+        for attr_name in sorted(dir(module)):
+            func = getattr(module, attr_name)
+            if attr_name.startswith("bench_") and callable(func) and getattr(func, "__module__", None) == module.__name__:
+                key = f"{module.__name__}.{attr_name}"
+                if not name_filter or name_filter in key:
+                    benchmarks[key] = func
+
+    return benchmarks
+
+
+def run(name_filter: str = None, repeat=1) -> dict:
+    """Runs the benchmarks (repeat times, keeping the best durations) and returns the results document"""
+
+    results, errors = dict(), dict()
+
+    for key, benchmark in discover(name_filter).items():
+        print(f"running {key} ...", file=sys.stderr, flush=True)
+        try:
+            for _ in range(repeat):
+                metrics = benchmark()
+                best = results.setdefault(key, dict())
+                for metric, value in metrics.items():
+                    if isinstance(value, float) and isinstance(best.get(metric), float):
+                        best[metric] = min(best[metric], value)
+                    else:
+                        best[metric] = value
+        except Exception:
+            errors[key] = traceback.format_exc()
+            results.pop(key, None)
+            print(errors[key], file=sys.stderr)
+
+    return {"machine": get_machine_metadata(), "results": results, "errors": errors}
+
+
+def compare(baseline: dict, current: dict, threshold=DEFAULT_THRESHOLD) -> List[dict]:
+    """Returns a row per duration present in both documents, flagging the ones slower by more than threshold"""
+
+    rows = []
+    for key, metrics in sorted(current["results"].items()):
+        for metric, value in sorted(metrics.items()):
+            baseline_value = baseline["results"].get(key, dict()).get(metric)
+            if not isinstance(value, float) or not isinstance(baseline_value, float) or baseline_value <= 0:
+                continue
+
+            change = value / baseline_value - 1
+            rows.append({"benchmark": f"{key}.{metric}",
+                         "baseline": baseline_value,
+                         "current": value,
+                         "change": change,
+                         "regression": change > threshold})
+    return rows
+
+
+def _print_comparison(rows: List[dict], baseline: dict, current: dict):
+    for field in ("hostname", "platform", "cpu_count", "python"):
+        if baseline["machine"].get(field) != current["machine"].get(field):
+            print(f"WARNING: machine {field} differs: {baseline['machine'].get(field)} != "
+                  f"{current['machine'].get(field)}")
+
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:<72} {row['baseline']:12.6f} {row['current']:12.6f} {row['change']:+8.1%} {flag}")
+
+
+def _load(file: str) -> dict:
+    with open(file, "r", encoding="utf-8") as in_file:
+        return json.load(in_file)
+
+
+def _save(document: dict, file: str):
+    with open(file, "w", encoding="utf-8") as out_file:
+        json.dump(document, out_file, indent=2, sort_keys=True)
+
+
+def _parse_args(args):
+    parser = argparse.ArgumentParser("Run the hed_utils benchmarks and compare them against a baseline")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and record the results")
+    run_parser.add_argument("-o", "--output", dest="output", metavar="FILE", default=None,
+                            help="the results file (printed to stdout if not set)")
+
+    compare_parser = commands.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline", metavar="BASELINE", help="the baseline results file")
+    compare_parser.add_argument("current", metavar="CURRENT", nargs="?", default=None,
+                                help="the results file to compare (runs the benchmarks if not set)")
+    compare_parser.add_argument("-t", "--threshold", dest="threshold", type=float, default=DEFAULT_THRESHOLD,
+                                metavar="RATIO", help="the allowed slowdown ratio (default: %(default)s)")
+
+    for sub_parser in (run_parser, compare_parser):
+        sub_parser.add_argument("-k", dest="filter", metavar="FILTER", default=None,
+                                help="run only the benchmarks whose name contains FILTER")
+        sub_parser.add_argument("-r", "--repeat", dest="repeat", type=int, default=1, metavar="N",
+                                help="run each benchmark N times and keep the best durations")
+
+    return parser.parse_args(args)
+
+
+def main(args) -> int:
+    args = _parse_args(args)
+
+    if args.command == "run":
+        document = run(args.filter, args.repeat)
+        if args.output:
+            _save(document, args.output)
+        else:
+            print(json.dumps(document, indent=2, sort_keys=True))
+        return 1 if document["errors"] else 0
+
+    baseline = _load(args.baseline)
+    current = _load(args.current) if args.current else run(args.filter, args.repeat)
+    rows = compare(baseline, current, args.threshold)
+    _print_comparison(rows, baseline, current)
+    return 1 if any(row["regression"] for row in rows) or current["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
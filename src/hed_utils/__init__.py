@@ -1,17 +1,40 @@
 # -*- coding: utf-8 -*-
-from pkg_resources import get_distribution, DistributionNotFound
+from importlib import import_module
 
-try:
-    # Change here if project is renamed and does not equal the package name
-    dist_name = 'hed_utils'
-    __version__ = get_distribution(dist_name).version
-except DistributionNotFound:
-    __version__ = 'unknown'
-finally:
-    del get_distribution, DistributionNotFound
-
-from . import support
+# Change here if project is renamed and does not equal the package name
+dist_name = 'hed_utils'
 
 __all__ = [
     "support",
 ]
+
+
+def _get_version() -> str:
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:  # pragma: no cover (python < 3.8)
+        from pkg_resources import get_distribution, DistributionNotFound as PackageNotFoundError
+
+        def version(name):
+            return get_distribution(name).version
+
+    try:
+        return version(dist_name)
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+def __getattr__(name):
+    # the version lookup and the sub-packages are loaded on first access to keep 'import hed_utils' cheap
+    if name == "__version__":
+        globals()[name] = _get_version()
+        return globals()[name]
+
+    if name in __all__:
+        return import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + ["__version__"] + __all__)
@@ -1,9 +1,8 @@
 import argparse
+import json
 import logging
 import sys
 
-from tabulate import tabulate
-
 from hed_utils.support import log, os_util
 
 __author__ = "nachereshata"
@@ -18,18 +17,55 @@ def _parse_args(args):
 
     parser.add_argument("-n", "--name",
                         dest="name",
-                        help="Name of the processes to kill",
+                        help="Name of the processes to kill (can be repeated)",
                         metavar="NAME",
                         type=str,
+                        action="append",
                         default=None)
 
     parser.add_argument("-p", "--pattern",
                         dest="pattern",
-                        help="Regex pattern used for matching the process name",
+                        help="Regex pattern used for matching the process name (can be repeated)",
+                        metavar="PATTERN",
+                        type=str,
+                        action="append",
+                        default=None)
+
+    parser.add_argument("-c", "--cmdline",
+                        dest="cmdline",
+                        help="Regex pattern used for matching the process command line",
+                        metavar="PATTERN",
+                        type=str,
+                        default=None)
+
+    parser.add_argument("-e", "--exe",
+                        dest="exe",
+                        help="Regex pattern used for matching the process executable path",
                         metavar="PATTERN",
                         type=str,
                         default=None)
 
+    parser.add_argument("-u", "--user",
+                        dest="username",
+                        help="Name of the user owning the processes",
+                        metavar="USER",
+                        type=str,
+                        default=None)
+
+    parser.add_argument("-a", "--min-age",
+                        dest="min_age",
+                        help="Minimum age (in seconds) of the processes",
+                        metavar="SECONDS",
+                        type=float,
+                        default=None)
+
+    parser.add_argument("-pp", "--ppid",
+                        dest="ppid",
+                        help="Parent process id of the processes",
+                        metavar="PPID",
+                        type=int,
+                        default=None)
+
     parser.add_argument("-i", "--ignorecase",
                         dest="ignorecase",
                         help="Flag for matching the name/pattern",
@@ -44,6 +80,14 @@ def _parse_args(args):
                         type=int,
                         default=None)
 
+    parser.add_argument("-w", "--watch",
+                        dest="watch",
+                        help="Stay resident and check the newly started processes every INTERVAL seconds, "
+                             "printing a JSON summary line per check",
+                        metavar="INTERVAL",
+                        type=float,
+                        default=None)
+
     parser.add_argument("-d", "--dry",
                         dest="dry",
                         help="Make a dry run (don't kill - just print the victims)",
@@ -70,7 +114,51 @@ def _parse_args(args):
                         action="store_const",
                         const=logging.DEBUG)
 
-    return parser.parse_args(args)
+    parsed_args = parser.parse_args(args)
+
+    criteria = (parsed_args.name, parsed_args.pattern, parsed_args.cmdline, parsed_args.exe,
+                parsed_args.username, parsed_args.ppid)
+    has_criteria = any(value is not None for value in criteria)
+
+    if parsed_args.watch is not None:
+        if parsed_args.pid is not None:
+            parser.error("--pid can't be used with --watch")
+
+        if not has_criteria:
+            parser.error("--watch needs at least one of the criteria: --name, --pattern, --cmdline, --exe, --user, "
+                         "--ppid")
+
+    if parsed_args.min_age is not None and not has_criteria:
+        parser.error("--min-age only filters the processes - add at least one of the criteria: --name, --pattern, "
+                     "--cmdline, --exe, --user, --ppid")
+
+    return parsed_args
+
+
+def _watch(args):
+    matcher = os_util.ProcessMatcher(names=args.name or (),
+                                     patterns=args.pattern or (),
+                                     cmdline=args.cmdline,
+                                     exe=args.exe,
+                                     username=args.username,
+                                     min_age=args.min_age,
+                                     ppid=args.ppid,
+                                     ignorecase=args.ignorecase)
+
+    watcher = os_util.ProcessWatcher(matcher, dry=args.dry)
+
+    try:
+        for tick in watcher.watch(args.watch):
+            summary = {"tick": tick.tick,
+                       "timestamp": tick.timestamp,
+                       "processes": tick.processes,
+                       "new": tick.new,
+                       "gone": tick.gone,
+                       "scan_ms": round(tick.scan_duration * 1000, 3),
+                       "victims": [victim._asdict() for victim in tick.victims]}
+            print(json.dumps(summary), flush=True)
+    except KeyboardInterrupt:
+        pass
 
 
 def main(args):
@@ -81,15 +169,34 @@ def main(args):
     """
 
     args = _parse_args(args)
+
+    if args.watch is not None:
+        if args.loglevel:
+            log.init(level=args.loglevel)
+        _watch(args)
+        return
+
+    from tabulate import tabulate
+
     print(f"kill_all(name='{args.name}', pattern='{args.pattern}', pid='{args.pid}', ignorecase='{args.ignorecase}', "
-          f"dry='{args.dry}')")
+          f"cmdline='{args.cmdline}', exe='{args.exe}', user='{args.username}', min_age='{args.min_age}', "
+          f"ppid='{args.ppid}', dry='{args.dry}')")
 
     if args.loglevel:
         log.init(level=args.loglevel)
 
     victims = [victim._asdict()
                for victim
-               in os_util.kill_all(name=args.name, pattern=args.pattern, pid=args.pid, dry=args.dry)]
+               in os_util.kill_all(name=args.name,
+                                   pattern=args.pattern,
+                                   pid=args.pid,
+                                   ignorecase=args.ignorecase,
+                                   cmdline=args.cmdline,
+                                   exe=args.exe,
+                                   username=args.username,
+                                   min_age=args.min_age,
+                                   ppid=args.ppid,
+                                   dry=args.dry)]
 
     print(f"kill_all victims:\n" + tabulate(victims, headers="keys"))
 
@@ -1,5 +1,14 @@
-from . import log
-from . import os_util
-from . import persistence
+from importlib import import_module
 
-__all__ = ["log", "os_util", "persistence"]
+__all__ = ["log", "log_rotation", "os_util", "persistence"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,16 +1,23 @@
 import inspect
+import itertools
+import json
 import logging
+import os
 import sys
+import threading
+import time
 from collections import OrderedDict
 from datetime import datetime
 from functools import wraps, partial
 from pathlib import Path
 from timeit import default_timer as now
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Sized, Tuple
 
 LOGGER_FMT = "%(levelname)-8s | %(name)-20s | %(indent)s %(message)s"
 PREFIX_UTC = "%(utcnow)s | "
 
+DEFAULT_PROFILE_CPU_THRESHOLD = 1.0
+
 _logger = logging.getLogger("hed_utils")
 
 debug = _logger.debug
@@ -34,9 +41,85 @@ class Indentation:
     def get(self) -> str:
         return self._size * self._value
 
+    @property
+    def size(self) -> int:
+        return self._size
+
 
 _indentation = Indentation()
 
+# the global defaults for the log.call profiling options (set by init)
+_profiling = {
+    "memory": False,
+    "cpu": False,
+    "cpu_threshold": DEFAULT_PROFILE_CPU_THRESHOLD,
+    "dir": None,
+}
+
+# set by init(structured=True) - the log.call messages are kept short, the details are only in the record fields
+_structured = False
+
+_memory_lock = threading.Lock()
+
+# [start bytes, peak bytes] of every call being memory profiled
+_memory_frames = []
+
+_tracemalloc_started = False
+
+_cpu_profiling = threading.local()
+
+_profile_counter = itertools.count()
+
+_span_counter = itertools.count(1)
+
+# the span ids of the log.call calls in progress per thread
+_spans = threading.local()
+
+_json_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str).encode
+
+# the attributes every LogRecord has - anything else was attached through 'extra' or by a tag factory
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord(dict()))) | {"message", "asctime", "indent", "utcnow"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats the records as single line JSON objects, including the attributes passed as 'extra'"""
+
+    def __init__(self):
+        super().__init__()
+        self._second = (None, "")
+
+    def _format_time(self, created: float, msecs: float) -> str:
+        # the records come in bursts - the formatted date and time are reused within the same second
+        second, text = self._second
+        if second != int(created):
+            second, text = int(created), time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(created))
+            self._second = (second, text)
+        return f"{text}.{int(msecs):03d}Z"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "time": self._format_time(record.created, record.msecs),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                fields[key] = value
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields["exception"] = record.exc_text
+        if record.stack_info:
+            fields["stack"] = self.formatStack(record.stack_info)
+
+        return _json_encode(fields)
+
 
 def add_tag_factory(tag, callback):
     old_factory = logging.getLogRecordFactory()
@@ -49,7 +132,45 @@ def add_tag_factory(tag, callback):
     logging.setLogRecordFactory(new_factory)
 
 
-def init(*, level=None, fmt=None, utc_prefix=True, file=None):
+def _get_file_handler(file, max_bytes: int, rotate_interval: float, backup_count: int) -> logging.Handler:
+    if not (max_bytes or rotate_interval):
+        return logging.FileHandler(filename=str(Path(file).absolute()), encoding="utf-8")
+
+    from hed_utils.support.log_rotation import CompressingRotatingFileHandler
+    return CompressingRotatingFileHandler(file, max_bytes=max_bytes, interval=rotate_interval,
+                                          backup_count=backup_count)
+
+
+def init(*,
+         level=None,
+         fmt=None,
+         utc_prefix=True,
+         file=None,
+         profile_memory=False,
+         profile_cpu=False,
+         profile_cpu_threshold=DEFAULT_PROFILE_CPU_THRESHOLD,
+         profile_dir=None,
+         structured=False,
+         max_bytes=0,
+         rotate_interval=0,
+         backup_count=0):
+    """Sets up the logging to stdout (and to file if given)
+
+    With structured=True the records are written as JSON objects (see JsonFormatter) and the log.call messages
+    are reduced to '---> <function>' / '<function> <---', the call details being in the record fields.
+
+    The file is rotated when it reaches max_bytes and/or every rotate_interval seconds, keeping the last
+    backup_count (0 keeps all) gzip compressed segments - see log_rotation.CompressingRotatingFileHandler.
+    """
+
+    global _structured
+
+    _profiling.update(memory=profile_memory,
+                      cpu=profile_cpu,
+                      cpu_threshold=profile_cpu_threshold,
+                      dir=profile_dir)
+    _structured = structured
+
     if level is None:
         level = logging.DEBUG
 
@@ -59,6 +180,19 @@ def init(*, level=None, fmt=None, utc_prefix=True, file=None):
     if utc_prefix:
         fmt = PREFIX_UTC + fmt
 
+    if structured:
+        # the records carry their own timestamp and the call depth, the fmt tags are not needed
+        formatter = JsonFormatter()
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(formatter)
+        logging.basicConfig(level=level, handlers=[handler])
+
+        if file:
+            handler = _get_file_handler(file, max_bytes, rotate_interval, backup_count)
+            handler.setFormatter(formatter)
+            _logger.addHandler(handler)
+        return
+
     logging.basicConfig(level=level, stream=sys.stdout, format=fmt)
 
     if "%(indent)" in fmt:
@@ -69,7 +203,7 @@ def init(*, level=None, fmt=None, utc_prefix=True, file=None):
 
     if file:
         formatter = logging.Formatter(fmt=fmt)
-        handler = logging.FileHandler(filename=str(Path(file).absolute()), encoding="utf-8")
+        handler = _get_file_handler(file, max_bytes, rotate_interval, backup_count)
         handler.setFormatter(formatter)
         _logger.addHandler(handler)
 
@@ -162,9 +296,135 @@ class CallFormatter:
         return result
 
 
-def call(func=None, *, level=logging.DEBUG, skip_args=None, log_result=True, name=None):
+def _update_memory_peaks(peak: int):
+    """Carries the traced peak over to the active frames before resetting it
+
+    The peak reset needs python 3.9+ - before that the traced peak only grows, so a frame's peak includes the
+    highest peak reached since tracemalloc was started, even before the frame began.
+    """
+
+    import tracemalloc
+
+    for frame in _memory_frames:
+        frame[1] = max(frame[1], peak)
+
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+
+def _start_memory_profile() -> list:
+    global _tracemalloc_started
+
+    import tracemalloc
+
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_started = True
+
+        current, peak = tracemalloc.get_traced_memory()
+        _update_memory_peaks(peak)
+        frame = [current, current]
+        _memory_frames.append(frame)
+        return frame
+
+
+def _stop_memory_profile(frame: list) -> Tuple[int, int]:
+    """Returns the (net, peak) bytes allocated since the frame start"""
+
+    global _tracemalloc_started
+
+    import tracemalloc
+
+    with _memory_lock:
+        current, peak = tracemalloc.get_traced_memory()
+        _update_memory_peaks(peak)
+        _memory_frames.remove(frame)
+
+        if _tracemalloc_started and not _memory_frames:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+
+    return current - frame[0], frame[1] - frame[0]
+
+
+def _start_cpu_profile():
+    # a nested call is already covered by the profile of the outer one
+    if getattr(_cpu_profiling, "active", False):
+        return None
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiling tool is active
+        return None
+
+    _cpu_profiling.active = True
+    return profiler
+
+
+def _stop_cpu_profile(profiler, full_name: str, duration: float, threshold: float, profile_dir) -> Optional[str]:
+    """Returns the .prof file the stats were dumped to (None if the call was faster than the threshold)"""
+
+    profiler.disable()
+    _cpu_profiling.active = False
+
+    if duration < threshold:
+        return None
+
+    if profile_dir is None:
+        from tempfile import gettempdir
+        profile_dir = Path(gettempdir()).joinpath("hed_utils_profiles")
+
+    profile_dir = Path(profile_dir).absolute()
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    profile_file = profile_dir.joinpath(f"{full_name}.{timestamp}.{os.getpid()}.{next(_profile_counter)}.prof")
+    profiler.dump_stats(str(profile_file))
+    return str(profile_file)
+
+
+def _get_spans() -> list:
+    try:
+        return _spans.stack
+    except AttributeError:
+        _spans.stack = []
+        return _spans.stack
+
+
+def call(func=None,
+         *,
+         level=logging.DEBUG,
+         skip_args=None,
+         log_result=True,
+         name=None,
+         profile_memory=None,
+         profile_cpu=None,
+         profile_cpu_threshold=None,
+         profile_dir=None):
+    """Logs the calls of the decorated function - the arguments, the result (or exception) and the duration
+
+    The records carry the machine readable fields 'function', 'depth', 'span_id', 'parent_id' and (on return)
+    'duration_ms', 'result_type', 'result_len' or (on exception) 'exception_type' as attributes. In the structured
+    mode (see init) the messages are short and the formatted call and the result go to the 'call' and 'result'
+    fields instead.
+
+    The profile_* options default to the ones set by init. With profile_memory the net and the peak bytes
+    allocated during the call (traced by tracemalloc) are logged. With profile_cpu the call runs under cProfile
+    and the stats of the calls lasting profile_cpu_threshold seconds or more are dumped to .prof files in
+    profile_dir (the temp dir by default).
+
+    The memory figures are process wide - tracemalloc traces the allocations of all the threads, so calls running
+    concurrently are charged for each other's allocations. On python < 3.9 (no tracemalloc.reset_peak) the peak
+    of a call also includes the higher peaks reached earlier while tracing, so only the net bytes are exact there.
+    """
+
     if func is None:
-        return partial(call, level=level, skip_args=skip_args, log_result=log_result, name=name)
+        return partial(call, level=level, skip_args=skip_args, log_result=log_result, name=name,
+                       profile_memory=profile_memory, profile_cpu=profile_cpu,
+                       profile_cpu_threshold=profile_cpu_threshold, profile_dir=profile_dir)
 
     skip_args = skip_args or []
 
@@ -176,38 +436,89 @@ def call(func=None, *, level=logging.DEBUG, skip_args=None, log_result=True, nam
     call_formatter = CallFormatter(func)
     call_logger = logging.getLogger(name if name else call_formatter.func_module)
 
+    def stop_profiling(memory_frame, profiler, call_duration, fields):
+        if profiler is not None:
+            threshold = _profiling["cpu_threshold"] if profile_cpu_threshold is None else profile_cpu_threshold
+            profile_file = _stop_cpu_profile(profiler, call_formatter.full_name, call_duration, threshold,
+                                             _profiling["dir"] if profile_dir is None else profile_dir)
+            if profile_file:
+                fields["cpu_profile"] = profile_file
+        if memory_frame is not None:
+            fields["memory_net"], fields["memory_peak"] = _stop_memory_profile(memory_frame)
+
+    def format_profile(fields) -> str:
+        profile_msg = ""
+        if "cpu_profile" in fields:
+            profile_msg += f" cpu profile: <{fields['cpu_profile']}>"
+        if "memory_net" in fields:
+            profile_msg += f" memory: <net: {fields['memory_net']} B, peak: {fields['memory_peak']} B>"
+        return profile_msg
+
+    def format_result(call_result, call_result_type: str) -> str:
+        if log_result:
+            return f"<{call_result_type}, {call_result}>"
+
+        result_msg = f"<{call_result_type}"
+        if hasattr(call_result, "__len__"):
+            result_msg += f", len: {len(call_result)}"
+        return result_msg + ">"
+
     @wraps(func)
     def wrapper(*args, **kwargs):
 
-        call_msg = "---> " + call_formatter.format_call(*args, skip_args=skip_args, **kwargs)
-        call_logger.log(level, call_msg)
+        spans = _get_spans()
+        call_fields = {"function": call_formatter.full_name,
+                       "depth": len(spans),
+                       "span_id": next(_span_counter),
+                       "parent_id": spans[-1] if spans else None}
+
+        call_msg = call_formatter.format_call(*args, skip_args=skip_args, **kwargs)
+        if _structured:
+            call_logger.log(level, f"---> {call_formatter.full_name}", extra=dict(call_fields, call=call_msg))
+        else:
+            call_logger.log(level, "---> " + call_msg, extra=call_fields)
+        spans.append(call_fields["span_id"])
         _indentation.increment()
 
+        memory_frame = profiler = None
+        if _profiling["memory"] if profile_memory is None else profile_memory:
+            memory_frame = _start_memory_profile()
+        if _profiling["cpu"] if profile_cpu is None else profile_cpu:
+            profiler = _start_cpu_profile()
+
         start_time = now()
         try:
             call_result = func(*args, **kwargs)
+        except:
             call_duration = now() - start_time
-            call_result_type = type(call_result).__name__
+            fields = dict(call_fields, duration_ms=call_duration * 1000, exception_type=sys.exc_info()[0].__name__)
+            stop_profiling(memory_frame, profiler, call_duration, fields)
+            spans.pop()
             _indentation.decrement()
-
-            if log_result:
-                result_msg = f"<{call_result_type}, {call_result}>"
+            if _structured:
+                call_logger.exception(f"{call_formatter.full_name} <--- Exception", extra=fields)
             else:
-                result_msg = f"<{call_result_type}"
-                if hasattr(call_result, "__len__"):
-                    result_msg += f", len: {len(call_result)}"
-                result_msg += f">"
+                call_logger.exception(f"{call_formatter.full_name} <--- Exception after "
+                                      f"{call_duration * 1000:0.6f} ms.{format_profile(fields)}", extra=fields)
+            raise
 
-            call_logger.log(level,
-                            f"{call_formatter.full_name} <--- {result_msg} {call_duration * 1000:0.6f} ms.")
-            return call_result
+        call_duration = now() - start_time
+        call_result_type = type(call_result).__name__
+        fields = dict(call_fields, duration_ms=call_duration * 1000, result_type=call_result_type,
+                      result_len=len(call_result) if isinstance(call_result, Sized) else None)
+        stop_profiling(memory_frame, profiler, call_duration, fields)
+        spans.pop()
+        _indentation.decrement()
 
-        except:
-            call_duration = now() - start_time
-            _indentation.decrement()
-            call_logger.exception(
-                f"{call_formatter.func_module}.{call_formatter.func_name} "
-                f"<--- Exception after {call_duration * 1000:0.6f} ms.")
-            raise
+        if _structured:
+            if log_result:
+                fields["result"] = repr(call_result)
+            call_logger.log(level, f"{call_formatter.full_name} <---", extra=fields)
+        else:
+            call_logger.log(level,
+                            f"{call_formatter.full_name} <--- {format_result(call_result, call_result_type)} "
+                            f"{call_duration * 1000:0.6f} ms.{format_profile(fields)}",
+                            extra=fields)
+        return call_result
 
     return wrapper
@@ -0,0 +1,177 @@
+"""Log file rotation by size and/or time, with the rotated segments gzip compressed on a background thread
+
+The naming is crash safe - the active file is rotated by a single atomic rename to '<file>.<UTC timestamp>'
+(there is no numbered chain of renames to be interrupted half way) and a segment is compressed to
+'<segment>.gz.tmp', which is renamed to '<segment>.gz' only when complete. The segments left uncompressed
+by a crash (and any partial .tmp files) are picked up when the handler is created again.
+"""
+import gzip
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import BaseRotatingHandler
+from pathlib import Path
+from typing import List, Union
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+_STOP = object()
+
+
+class CompressingRotatingFileHandler(BaseRotatingHandler):
+    """Rotates the log file when it reaches max_bytes and/or every interval seconds
+
+    The rotation itself is a rename done by the logging thread, the compression and the pruning of the segments
+    beyond backup_count (0 keeps all) run on a background thread. A segment can exceed max_bytes by one record.
+    """
+
+    def __init__(self,
+                 filename: Union[str, Path],
+                 *,
+                 max_bytes=0,
+                 interval=0,
+                 backup_count=0,
+                 compress=True,
+                 encoding="utf-8"):
+
+        if max_bytes < 0 or interval < 0 or backup_count < 0:
+            raise ValueError(f"the rotation options can't be negative! ({max_bytes}, {interval}, {backup_count})")
+
+        super().__init__(str(Path(filename).absolute()), mode="a", encoding=encoding)
+
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self._rollover_at = (time.time() + interval) if interval else None
+        self._last_stamp = 0
+        self._segment_pattern = re.compile(rf"{re.escape(os.path.basename(self.baseFilename))}"
+                                           rf"\.(\d{{8}}-\d{{6}}-\d{{6}})(\.gz)?")
+
+        self._jobs = queue.Queue()
+        self._worker = threading.Thread(target=self._work, name="log-rotation", daemon=True)
+        self._worker.start()
+        self._recover()
+
+    def shouldRollover(self, record) -> bool:
+        if (self._rollover_at is not None) and (time.time() >= self._rollover_at):
+            return True
+
+        if self.max_bytes:
+            if self.stream is None:
+                self.stream = self._open()
+            return self.stream.tell() >= self.max_bytes
+
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+            segment = self._next_segment_name()
+            os.replace(self.baseFilename, segment)
+            self._jobs.put(segment)
+
+        if self.interval:
+            self._rollover_at = time.time() + self.interval
+
+        self.stream = self._open()
+
+    def close(self):
+        super().close()
+
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            self._jobs.put(_STOP)
+            worker.join()
+
+    def segments(self) -> List[str]:
+        """Returns the paths of the rotated segments (compressed or not), oldest first"""
+
+        directory = os.path.dirname(self.baseFilename)
+        stamps = dict()
+        for name in os.listdir(directory):
+            match = self._segment_pattern.fullmatch(name)
+            if match:
+                # a compressed segment takes precedence over its leftover original
+                if match.group(2) or match.group(1) not in stamps:
+                    stamps[match.group(1)] = os.path.join(directory, name)
+
+        return [stamps[stamp] for stamp in sorted(stamps)]
+
+    def _next_segment_name(self) -> str:
+        # strictly increasing stamps - the names sort in the rotation order
+        stamp = max(int(time.time() * 1000000), self._last_stamp + 1)
+        while True:
+            self._last_stamp = stamp
+            seconds, micros = divmod(stamp, 1000000)
+            segment = f"{self.baseFilename}.{time.strftime('%Y%m%d-%H%M%S', time.gmtime(seconds))}-{micros:06d}"
+            if not (os.path.exists(segment) or os.path.exists(f"{segment}.gz")):
+                return segment
+            stamp += 1
+
+    def _recover(self):
+        """Removes the partial .tmp files and queues the segments left uncompressed by a previous run"""
+
+        directory = os.path.dirname(self.baseFilename)
+        prefix = f"{os.path.basename(self.baseFilename)}."
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name.endswith(".gz.tmp"):
+                os.unlink(os.path.join(directory, name))
+
+        for segment in self.segments():
+            if not segment.endswith(".gz"):
+                self._jobs.put(segment)
+
+        # a job without a segment only prunes
+        self._jobs.put(None)
+
+    def _compress(self, segment: str):
+        compressed = f"{segment}.gz"
+        tmp_file = f"{compressed}.tmp"
+
+        try:
+            with open(segment, "rb") as in_file, open(tmp_file, "wb") as out_file:
+                with gzip.GzipFile(filename=os.path.basename(segment), mode="wb", fileobj=out_file) as gz_file:
+                    shutil.copyfileobj(in_file, gz_file, _COPY_CHUNK_SIZE)
+                out_file.flush()
+                os.fsync(out_file.fileno())
+        except FileNotFoundError:  # already pruned
+            return
+
+        os.replace(tmp_file, compressed)
+        os.unlink(segment)
+
+    def _prune(self):
+        if not self.backup_count:
+            return
+
+        segments = self.segments()
+        for segment in segments[:max(0, len(segments) - self.backup_count)]:
+            segment = segment[:-3] if segment.endswith(".gz") else segment
+            for path in (segment, f"{segment}.gz"):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def _work(self):
+        while True:
+            segment = self._jobs.get()
+            try:
+                if segment is _STOP:
+                    return
+                if segment is not None and self.compress:
+                    self._compress(segment)
+                self._prune()
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                self._jobs.task_done()
@@ -1,20 +1,28 @@
+import os
 import platform
 import re
+import stat
 import sys
+import time
+from array import array
 from collections import namedtuple
+from functools import partial
 from pathlib import Path
-from typing import List
-
-import psutil
+from timeit import default_timer as now
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Union, TYPE_CHECKING
 
 from hed_utils.support import log
-from hed_utils.support.persistence import file_sys
+
+if TYPE_CHECKING:
+    import psutil
 
 __author__ = "nachereshata"
 __copyright__ = "nachereshata"
 __license__ = "mit"
 
-KillVictim = namedtuple("KillVictim", "ppid pid name status")
+KillVictim = namedtuple("KillVictim", "ppid pid name status elapsed")
+
+WatchTick = namedtuple("WatchTick", "tick timestamp processes new gone victims scan_duration")
 
 IS_WINDOWS = platform.system() == "Windows"
 
@@ -24,128 +32,760 @@ IS_MAC = platform.system() in ("Darwin", "macosx")
 
 IS_64BITS = sys.maxsize > 2 ** 32
 
+# the temp copies made by view_file/view_text are deleted after a day or above 1GB in total
+VIEW_MAX_AGE = 24 * 60 * 60
 
-@log.call
-def _kill(process: psutil.Process, timeout=5) -> bool:
-    """Attempts to kill the process in a fail-safe manner and returns status
+VIEW_MAX_BYTES = 1024 ** 3
+
+_view_workspace = None
+
+# /proc and psutil may compute the process creation time from differently rounded boot times
+_CREATE_TIME_TOLERANCE = 0.01
+
+
+@log.call(skip_args=["processes"])
+def _kill(processes: List["psutil.Process"], timeout=5) -> Dict[int, Tuple[str, Optional[float]]]:
+    """Kills the processes concurrently in a fail-safe manner and returns the status of each one
 
-    Tries to terminate the process first and waits for it for the given timeout.
-    If termination fails - attempts to kill the process instead and wait for it to die.
+    Sends terminate to all the processes at once (in the given order - children first) and waits for
+    all of them together for the given timeout. Only the survivors are then killed and waited for again.
 
     Args:
-        process(Process):   the process that is to be killed
-        timeout(int):       the timeout to wait after each terminate/kill attempt
+        processes(list):    the processes that are to be killed, children before their parents
+        timeout(int):       the shared timeout to wait after the terminate and after the kill round
 
     Returns:
-        obj(bool):          True if the process has been killed/terminated,
-                            False if the process is still running after this method returns
+        obj(dict):          pid -> (status, seconds from the terminate signal until the process exited)
+                            where status is one of:
+                                'GONE'          - the process was not running anymore
+                                'TERMINATED'    - the process exited after terminate
+                                'KILLED'        - the process exited after kill
+                                'ALIVE'         - the process is still running after this method returns
     """
 
-    if not process.is_running():
-        return True
+    import psutil
 
-    try:
-        process.terminate()
+    results = dict()
+    start_time = now()
+    status = "TERMINATED"
+
+    def on_exit(process):
+        results[process.pid] = (status, now() - start_time)
+
+    def signal_all(signal_func, targets):
+        signalled = []
+        for process in targets:
+            try:
+                signal_func(process)
+                signalled.append(process)
+            except psutil.NoSuchProcess:
+                results.setdefault(process.pid, ("GONE", None))
+            except psutil.Error:
+                results[process.pid] = ("ALIVE", None)
+        return signalled
+
+    def is_zombie(process):
         try:
-            process.wait(timeout)
+            return process.status() == psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
             return True
-        except:
-            process.kill()
+
+    def wait_all(targets):
+        # zombies have exited - they are only waiting to be reaped by their (possibly also dying) parent
+        deadline = now() + timeout
+        while targets:
+            _, targets = psutil.wait_procs(targets, timeout=min(0.1, max(0.0, deadline - now())), callback=on_exit)
+            for process in [process for process in targets if is_zombie(process)]:
+                on_exit(process)
+                targets.remove(process)
+            if now() >= deadline:
+                break
+        return targets
+
+    alive = wait_all(signal_all(psutil.Process.terminate, processes))
+
+    if alive:
+        status = "KILLED"
+        alive = wait_all(signal_all(psutil.Process.kill, alive))
+
+    for process in alive:
+        results[process.pid] = ("ALIVE", None)
+
+    return results
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as in_file:
+        return in_file.read()
+
+
+class _ProcFs:
+    """Bulk reader of the Linux /proc filesystem - the fast path for enumerating the process table
+
+    Reads /proc/[pid]/stat for every process and the other files only for the attributes requested.
+    Produces the same values as psutil for the supported attributes.
+    """
+
+    ATTRS = frozenset(("pid", "ppid", "name", "cmdline", "create_time", "exe", "username"))
+
+    AVAILABLE = IS_LINUX and os.path.isdir("/proc")
+
+    _boot_time = None
+    _clock_ticks = None
+    _usernames = dict()
+
+    @classmethod
+    def _get_boot_time(cls) -> float:
+        if cls._boot_time is None:
+            for line in _read_file("/proc/stat").splitlines():
+                if line.startswith(b"btime"):
+                    cls._boot_time = float(line.split()[1])
+                    break
+            cls._clock_ticks = os.sysconf("SC_CLK_TCK")
+        return cls._boot_time
+
+    @classmethod
+    def _get_username(cls, pid: int) -> Optional[str]:
+        for line in _read_file(f"/proc/{pid}/status").splitlines():
+            if line.startswith(b"Uid:"):
+                uid = int(line.split()[1])
+                break
+        else:
+            return None
+
+        if uid not in cls._usernames:
+            try:
+                import pwd
+                cls._usernames[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                cls._usernames[uid] = str(uid)
+        return cls._usernames[uid]
+
+    @staticmethod
+    def _get_cmdline(pid: int) -> List[str]:
+        data = _read_file(f"/proc/{pid}/cmdline").decode("utf-8", "surrogateescape")
+        if not data:
+            return []
+
+        # processes changing their title (setproctitle) may separate the args with spaces
+        sep = "\0" if data.endswith("\0") else " "
+        if data.endswith(sep):
+            data = data[:-1]
+        cmdline = data.split(sep)
+        if sep == "\0" and len(cmdline) == 1 and " " in data:
+            cmdline = data.split(" ")
+        return cmdline
+
+    @staticmethod
+    def _parse_stat(data: bytes) -> Tuple[str, List[bytes]]:
+        """Returns the (name, fields after the name) of a /proc/[pid]/stat line - fields[1] is the ppid
+
+        The name is enclosed in parentheses and may contain anything, including spaces and ')'.
+        """
+
+        name_end = data.rindex(b")")
+        name = data[data.index(b"(") + 1:name_end].decode("utf-8", "surrogateescape")
+        return name, data[name_end + 2:].split()
+
+    @classmethod
+    def pids(cls) -> List[int]:
+        return [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+
+    @classmethod
+    def read(cls,
+             attrs: Iterable[str],
+             only_pids: Iterable[int] = None) -> Tuple[array, array, List[str], Dict[str, list]]:
+        """Returns the (pids, ppids, names, extra attribute columns) of all (or only the given) processes"""
+
+        extras = [attr for attr in attrs if attr not in ProcessTable.ATTRS]
+        columns = {attr: [] for attr in extras}
+        pids, ppids, names = array("i"), array("i"), []
+        boot_time = cls._get_boot_time() if "create_time" in extras else None
+
+        for pid in (cls.pids() if only_pids is None else only_pids):
+            entry = str(pid)
+            try:
+                name, fields = cls._parse_stat(_read_file(f"/proc/{entry}/stat"))
+
+                values = dict()
+                cmdline = None
+                if "cmdline" in extras or len(name) >= 15:
+                    try:
+                        cmdline = cls._get_cmdline(pid)
+                    except PermissionError:
+                        cmdline = None
+
+                # the kernel truncates the name to 15 chars - recover it from the cmdline like psutil does
+                if len(name) >= 15 and cmdline:
+                    full_name = os.path.basename(cmdline[0])
+                    if full_name.startswith(name):
+                        name = full_name
+
+                for attr in extras:
+                    if attr == "cmdline":
+                        values[attr] = cmdline
+                    elif attr == "create_time":
+                        values[attr] = boot_time + int(fields[19]) / cls._clock_ticks
+                    elif attr == "exe":
+                        try:
+                            values[attr] = os.readlink(f"/proc/{entry}/exe")
+                        except FileNotFoundError:  # kernel threads have no exe
+                            values[attr] = ""
+                        except OSError:
+                            values[attr] = None
+                    elif attr == "username":
+                        values[attr] = cls._get_username(pid)
+
+            except (FileNotFoundError, ProcessLookupError):
+                continue  # the process exited while reading it
+
+            pids.append(pid)
+            ppids.append(int(fields[1]))
+            names.append(name)
+            for attr in extras:
+                columns[attr].append(values[attr])
+
+        return pids, ppids, names, columns
+
+
+class ProcessTable:
+    """A point-in-time snapshot of the process table, indexed by pid and by parent pid
+
+    Built in a single pass (reading /proc directly on Linux, via psutil.process_iter elsewhere),
+    so matching processes and collecting whole sub-trees are linear in the number of processes.
+    The table is column based - the pids/ppids are kept in compact arrays, the names and
+    any extra attributes in lists with the same row order.
+    """
+
+    ATTRS = ("pid", "ppid", "name")
+
+    def __init__(self, pids: array, ppids: array, names: List[str], columns: Dict[str, list] = None):
+        self.pids = pids
+        self.ppids = ppids
+        self.names = names
+        self.columns = columns or dict()
+        self._rows = {pid: row for row, pid in enumerate(pids)}
+        self._children = None
+
+    @classmethod
+    def from_infos(cls, infos: Iterable[dict], attrs: Iterable[str] = ()) -> "ProcessTable":
+        extras = [attr for attr in attrs if attr not in cls.ATTRS]
+        pids, ppids, names, columns = array("i"), array("i"), [], {attr: [] for attr in extras}
+
+        for info in infos:
+            pids.append(info["pid"])
+            ppids.append(info["ppid"] or 0)
+            names.append(info["name"])
+            for attr in extras:
+                columns[attr].append(info[attr])
+
+        return cls(pids, ppids, names, columns)
+
+    @staticmethod
+    def list_pids() -> List[int]:
+        """Returns the pids of all the running processes - the cheapest possible scan"""
+
+        if _ProcFs.AVAILABLE:
+            return _ProcFs.pids()
+
+        import psutil
+        return psutil.pids()
+
+    @staticmethod
+    def _iter_psutil_infos(attrs: List[str], pids: Iterable[int]):
+        import psutil
+
+        for pid in pids:
             try:
-                process.wait(timeout)
+                yield psutil.Process(pid).as_dict(attrs=attrs, ad_value=None)
+            except psutil.NoSuchProcess:
+                continue
+
+    @classmethod
+    def snapshot(cls, attrs=(), backend: str = None, pids: Iterable[int] = None) -> "ProcessTable":
+        """Snapshots the current process table, fetching the given psutil attributes on top of pid, ppid & name
+
+        Args:
+            attrs(list):    extra psutil attribute names to be fetched
+            backend(str):   'proc' to read /proc directly or 'psutil'. Defaults to 'proc'
+                            when available on this platform and supporting all of the attrs.
+            pids(list):     snapshot only these processes (the ones no longer running are skipped)
+        """
+
+        attrs = list(cls.ATTRS) + [attr for attr in attrs if attr not in cls.ATTRS]
+
+        if backend is None:
+            backend = "proc" if _ProcFs.AVAILABLE and _ProcFs.ATTRS.issuperset(attrs) else "psutil"
+
+        if backend == "proc":
+            return cls(*_ProcFs.read(attrs, pids))
+
+        if backend == "psutil":
+            import psutil
+
+            if pids is None:
+                infos = (process.info for process in psutil.process_iter(attrs=attrs, ad_value=None))
+            else:
+                infos = cls._iter_psutil_infos(attrs, pids)
+            return cls.from_infos(infos, attrs)
+
+        raise ValueError(f"unknown backend! ({backend})")
+
+    def __len__(self):
+        return len(self.pids)
+
+    def __contains__(self, pid):
+        return pid in self._rows
+
+    def __iter__(self):
+        return (self._row_info(row) for row in range(len(self.pids)))
+
+    def _row_info(self, row: int) -> dict:
+        info = {"pid": self.pids[row], "ppid": self.ppids[row], "name": self.names[row]}
+        for attr, column in self.columns.items():
+            info[attr] = column[row]
+        return info
+
+    def info(self, pid: int) -> dict:
+        try:
+            return self._row_info(self._rows[pid])
+        except KeyError:
+            import psutil
+            raise psutil.NoSuchProcess(pid) from None
+
+    def children(self, pid: int) -> List[int]:
+        if self._children is None:
+            self._children = dict()
+            for child_pid, ppid in zip(self.pids, self.ppids):
+                if child_pid != ppid:
+                    self._children.setdefault(ppid, []).append(child_pid)
+
+        return self._children.get(pid, [])
+
+    def subtree(self, pid: int) -> List[int]:
+        """Returns the pids of the process and all its descendants - children before their parents"""
+
+        self.info(pid)
+        result = []
+        stack = [(pid, False)]
+
+        while stack:
+            current_pid, expanded = stack.pop()
+            if expanded:
+                result.append(current_pid)
+            else:
+                stack.append((current_pid, True))
+                stack.extend((child_pid, False) for child_pid in self.children(current_pid))
+
+        return result
+
+    def find(self, predicate) -> List[int]:
+        """Returns the pids of the processes whose info dict satisfies the predicate"""
+
+        return [info["pid"] for info in self if predicate(info)]
+
+
+class ProcessMatcher:
+    """Process selection criteria compiled once and evaluated in a single pass over a ProcessTable
+
+    A process matches if its name equals any of the names (merged into one escaped regex alternation) or contains
+    any of the patterns (each one compiled on its own, so its flags, groups and backreferences keep their meaning).
+    The rest of the criteria narrow the selection further. At least one identifying criterion (names, patterns,
+    cmdline, exe, username or ppid) is required - min_age only filters, so it can't select e.g. pid 1 on its own.
+    Only the psutil attributes needed by the criteria are fetched (see attrs).
+
+    Args:
+        names(list):        exact process names
+        patterns(list):     regex patterns searched in the process name
+        cmdline(str):       regex pattern searched in the space joined command line
+        exe(str):           regex pattern searched in the executable path
+        username(str):      exact owner user name
+        min_age(float):     minimum seconds since the process creation
+        ppid(int):          the parent process id
+        ignorecase(bool):   case insensitive names and regex matching
+    """
+
+    def __init__(self,
+                 *,
+                 names: Iterable[str] = (),
+                 patterns: Iterable[str] = (),
+                 cmdline: str = None,
+                 exe: str = None,
+                 username: str = None,
+                 min_age: float = None,
+                 ppid: int = None,
+                 ignorecase=False):
+
+        names, patterns = list(names), list(patterns)
+
+        for value in names + patterns:
+            if not value:
+                raise ValueError(f"names/patterns must be non empty! ({names}, {patterns})")
+            if not isinstance(value, str):
+                raise TypeError(f"names/patterns must be str! ({type(value).__name__}) {value}")
+
+        flags = re.IGNORECASE if ignorecase else 0
+        self.names = names
+        self.patterns = patterns
+        self.cmdline = cmdline
+        self.exe = exe
+        self.username = username
+        self.min_age = min_age
+        self.ppid = ppid
+        self.ignorecase = ignorecase
+        self.names_regex = re.compile("|".join(re.escape(name) for name in names), flags) if names else None
+        self.pattern_regexes = [re.compile(pattern, flags) for pattern in patterns]
+        self.attrs = []
+        self._criteria = []
+
+        if names or patterns:
+            names_match = self.names_regex.fullmatch if names else None
+            searches = [regex.search for regex in self.pattern_regexes]
+            self._add_criteria("name", partial(self._match_name, names_match, searches))
+
+        if cmdline is not None:
+            self._add_criteria("cmdline", partial(self._search_cmdline, re.compile(cmdline, flags).search))
+
+        if exe is not None:
+            self._add_regex_criteria("exe", re.compile(exe, flags))
+
+        if username is not None:
+            self._add_criteria("username", lambda info: info["username"] == username)
+
+        if ppid is not None:
+            self._add_criteria("ppid", lambda info: info["ppid"] == ppid)
+
+        if min_age is not None:
+            self.attrs.append("create_time")
+
+        if not self._criteria:
+            raise ValueError(f"no identifying criteria set - min_age only filters them! ({min_age})")
+
+    def _add_criteria(self, attr, predicate):
+        if attr not in self.attrs:
+            self.attrs.append(attr)
+        self._criteria.append(predicate)
+
+    def _add_regex_criteria(self, attr, regex):
+        search = regex.search
+        self._add_criteria(attr, lambda info: (info[attr] is not None) and (search(info[attr]) is not None))
+
+    @staticmethod
+    def _match_name(names_match, searches, info) -> bool:
+        name = info["name"]
+        if name is None:
+            return False
+        if (names_match is not None) and (names_match(name) is not None):
+            return True
+        for search in searches:
+            if search(name) is not None:
                 return True
-            except:
-                pass
-    except:
-        pass
+        return False
 
-    return not process.is_running()
+    @staticmethod
+    def _search_cmdline(search, info) -> bool:
+        cmdline = info["cmdline"]
+        return bool(cmdline) and (search(" ".join(cmdline)) is not None)
 
+    def is_old_enough(self, info) -> bool:
+        if self.min_age is None:
+            return True
+        create_time = info["create_time"]
+        return (create_time is not None) and (time.time() - create_time >= self.min_age)
 
-@log.call(skip_args=["victims"], log_result=False)
-def _rkill(process: psutil.Process, *, dry=True) -> List[KillVictim]:
-    victims = []
+    def __repr__(self):
+        criteria = dict(names=self.names, patterns=self.patterns, cmdline=self.cmdline, exe=self.exe,
+                        username=self.username, min_age=self.min_age, ppid=self.ppid, ignorecase=self.ignorecase)
+        return "ProcessMatcher(" + ", ".join(f"{key}={value!r}" for key, value in criteria.items() if value) + ")"
+
+    def matches(self, info: dict, *, check_age=True) -> bool:
+        """Evaluates the criteria against a process info dict. The min_age check can be skipped with check_age=False"""
+
+        for criteria in self._criteria:
+            if not criteria(info):
+                return False
+        return self.is_old_enough(info) if check_age else True
+
+    def find(self, table: "ProcessTable") -> List[int]:
+        return table.find(self.matches)
 
-    if process.is_running():
 
-        with process.oneshot():
+def _same_create_time(create_time: Optional[float], other: Optional[float]) -> bool:
+    return (create_time is None) or (other is None) or (abs(create_time - other) < _CREATE_TIME_TOLERANCE)
 
-            ppid = process.ppid()
-            pid = process.pid
-            name = process.name()
 
-        for child_process in process.children(recursive=True):
-            victims.extend(_rkill(child_process, dry=dry))
+def _is_older(create_time: Optional[float], other: Optional[float]) -> bool:
+    return (create_time is not None) and (other is not None) and (other - create_time >= _CREATE_TIME_TOLERANCE)
 
-        victims.append(KillVictim(ppid, pid, name, ("SKIPPED" if dry else _kill(process))))
+
+def _is_same_process(process: "psutil.Process", info: dict) -> bool:
+    """Tells if the process is the one in the info (by creation time) and not another one that reused its pid"""
+
+    return _same_create_time(info["create_time"], process.create_time())
+
+
+def _kill_trees(table: ProcessTable, pids: List[int], *, dry=True, timeout=5) -> List[KillVictim]:
+    """Kills the processes and their descendants (children first) all at once, each process at most once"""
+
+    victim_pids = []
+    seen = set()
+
+    for pid in pids:
+        for victim_pid in table.subtree(pid):
+            if victim_pid not in seen:
+                seen.add(victim_pid)
+                victim_pids.append(victim_pid)
+
+    if dry:
+        results = {victim_pid: ("SKIPPED", None) for victim_pid in victim_pids}
+    else:
+        import psutil
+
+        create_times = table.columns.get("create_time")
+        processes = []
+        results = dict()
+        for victim_pid in victim_pids:
+            try:
+                process = psutil.Process(victim_pid)
+                # a different process reusing the pid of an exited victim must not be signalled
+                if create_times is not None and not _is_same_process(process, table.info(victim_pid)):
+                    results[victim_pid] = ("GONE", None)
+                    continue
+                processes.append(process)
+            except psutil.NoSuchProcess:
+                results[victim_pid] = ("GONE", None)
+        results.update(_kill(processes, timeout=timeout))
+
+    victims = []
+    for victim_pid in victim_pids:
+        info = table.info(victim_pid)
+        victims.append(KillVictim(info["ppid"], victim_pid, info["name"], *results[victim_pid]))
 
     return victims
 
 
-@log.call
-def kill_process_by_name(name: str, *, ignorecase=False, dry=True) -> List[KillVictim]:
+@log.call(skip_args=["table"])
+def kill_process_by_name(name: str,
+                         *,
+                         ignorecase=False,
+                         dry=True,
+                         timeout=5,
+                         table: ProcessTable = None) -> List[KillVictim]:
     if not name:
         raise ValueError(f"name not set!({name})")
 
     if not isinstance(name, str):
         raise TypeError(f"name must be str! ({name})")
 
-    victims = []
-    target_name = name.lower() if ignorecase else name
-
-    for process in psutil.process_iter():
-        process_name = process.name().lower() if ignorecase else process.name()
-
-        if process_name == target_name:
-            victims.extend(_rkill(process, dry=dry))
-
-    return victims
+    matcher = ProcessMatcher(names=[name], ignorecase=ignorecase)
+    return kill_process_by_matcher(matcher, dry=dry, timeout=timeout, table=table)
 
 
-@log.call
-def kill_process_by_pid(pid, dry=True) -> List[KillVictim]:
+@log.call(skip_args=["table"])
+def kill_process_by_pid(pid, dry=True, timeout=5, table: ProcessTable = None) -> List[KillVictim]:
     if not pid:
         raise ValueError(f"pid not set! ({pid})")
-    return _rkill(psutil.Process(pid=int(pid)), dry=dry)
 
+    table = table or ProcessTable.snapshot()
+    return _kill_trees(table, [int(pid)], dry=dry, timeout=timeout)
 
-@log.call
-def kill_process_by_pattern(pattern: str, ignorecase=False, dry=True) -> List[KillVictim]:
+
+@log.call(skip_args=["table"])
+def kill_process_by_pattern(pattern: str,
+                            ignorecase=False,
+                            dry=True,
+                            timeout=5,
+                            table: ProcessTable = None) -> List[KillVictim]:
     if not pattern:
         raise ValueError(f"pattern not set!({pattern})")
     if not isinstance(pattern, str):
         raise TypeError(f"pattern must be str! ({type(pattern).__name__}) {pattern}")
 
-    victims = []
+    matcher = ProcessMatcher(patterns=[pattern], ignorecase=ignorecase)
+    return kill_process_by_matcher(matcher, dry=dry, timeout=timeout, table=table)
 
-    for process in psutil.process_iter():
-        process_name = process.name()
 
-        if ignorecase:
-            should_kill = bool(re.findall(pattern, process_name, flags=re.IGNORECASE))
-        else:
-            should_kill = bool(re.findall(pattern, process_name))
+@log.call(skip_args=["table"])
+def kill_process_by_matcher(matcher: ProcessMatcher,
+                            *,
+                            dry=True,
+                            timeout=5,
+                            table: ProcessTable = None) -> List[KillVictim]:
+    table = table or ProcessTable.snapshot(matcher.attrs)
+    return _kill_trees(table, matcher.find(table), dry=dry, timeout=timeout)
 
-        if should_kill:
-            victims.extend(_rkill(process, dry=dry))
 
-    return victims
+def _as_list(value: Union[None, str, Iterable[str]]) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
 
 
 @log.call(log_result=False)
-def kill_all(*, name=None, pattern=None, pid=None, ignorecase=False, dry=False) -> List[KillVictim]:
-    victims = []
+def kill_all(*,
+             name: Union[str, List[str]] = None,
+             pattern: Union[str, List[str]] = None,
+             pid=None,
+             ignorecase=False,
+             dry=False,
+             timeout=5,
+             cmdline: str = None,
+             exe: str = None,
+             username: str = None,
+             min_age: float = None,
+             ppid: int = None,
+             matcher: ProcessMatcher = None) -> List[KillVictim]:
+    """Kills (along with their descendants) the processes matching the criteria and/or the process with the given pid
+
+    The name/pattern and the rest of the criteria are compiled in a single ProcessMatcher (see its docs)
+    and evaluated in one pass over a process table snapshot. A ready matcher can be passed instead.
+    """
+
+    criteria = dict(names=_as_list(name), patterns=_as_list(pattern), cmdline=cmdline, exe=exe,
+                    username=username, min_age=min_age, ppid=ppid)
+    has_criteria = any(value is not None and value != [] for value in criteria.values())
+
+    if matcher is not None and has_criteria:
+        raise ValueError(f"either matcher or criteria must be set! ({matcher}, {criteria})")
 
-    if name is not None:
-        victims.extend(kill_process_by_name(name, ignorecase=ignorecase, dry=dry))
+    if matcher is None and has_criteria:
+        matcher = ProcessMatcher(ignorecase=ignorecase, **criteria)
 
-    if pattern is not None:
-        victims.extend(kill_process_by_pattern(pattern, ignorecase=ignorecase, dry=dry))
+    table = ProcessTable.snapshot(matcher.attrs if matcher else ())
+    pids = matcher.find(table) if matcher else []
 
     if pid is not None:
-        victims.extend(kill_process_by_pid(pid, dry=dry))
+        if not pid:
+            raise ValueError(f"pid not set! ({pid})")
+        pids.append(int(pid))
 
-    return victims
+    return _kill_trees(table, pids, dry=dry, timeout=timeout)
+
+
+class ProcessWatcher:
+    """Keeps applying a ProcessMatcher to the newly appearing processes and kills the matching ones
+
+    Only the pid list is re-read on every tick - the processes are examined once, when they first appear,
+    so the per tick cost is proportional to the process churn, not to the process table size.
+    Processes matching all but the min_age criteria are kept aside and re-read (with their create_time)
+    on the next ticks - a pending pid reused in between is examined as a new process. The pids of the
+    other tracked processes are not re-checked, the victims are verified by create_time before being signalled.
+    """
+
+    def __init__(self, matcher: ProcessMatcher, *, dry=True, timeout=5):
+        self.matcher = matcher
+        self.dry = dry
+        self.timeout = timeout
+        self.ticks = 0
+        self._attrs = list(matcher.attrs) + ([] if "create_time" in matcher.attrs else ["create_time"])
+        # the create_times of a pid are compared across ticks - all the snapshots use the same backend
+        self._backend = "proc" if _ProcFs.AVAILABLE and _ProcFs.ATTRS.issuperset(self._attrs) else "psutil"
+        self._infos = dict()
+        self._children = dict()
+        self._pending = dict()
+
+    def _add(self, info: dict):
+        pid, ppid = info["pid"], info["ppid"]
+        self._infos[pid] = {"pid": pid, "ppid": ppid, "name": info["name"], "create_time": info["create_time"]}
+        if pid != ppid:
+            self._children.setdefault(ppid, set()).add(pid)
+
+    def _remove(self, pid: int):
+        info = self._infos.pop(pid)
+        self._pending.pop(pid, None)
+        siblings = self._children.get(info["ppid"])
+        if siblings is not None:
+            siblings.discard(pid)
+            if not siblings:
+                del self._children[info["ppid"]]
+
+    def _subtree_table(self, pids: List[int]) -> ProcessTable:
+        infos = dict()
+        stack = list(pids)
+        while stack:
+            pid = stack.pop()
+            if pid not in infos:
+                info = infos[pid] = self._infos[pid]
+                # a child can't be older than its parent - older ones belong to a previous owner of the pid
+                stack.extend(child for child in self._children.get(pid, ())
+                             if not _is_older(self._infos[child]["create_time"], info["create_time"]))
+        return ProcessTable.from_infos(infos.values(), ["create_time"])
+
+    def tick(self) -> WatchTick:
+        start_time = now()
+        self.ticks += 1
+
+        current = set(ProcessTable.list_pids())
+        known = self._infos.keys()
+        gone, new = known - current, current - known
+
+        for pid in gone:
+            self._remove(pid)
+
+        roots = []
+        for info in ProcessTable.snapshot(self._attrs, backend=self._backend, pids=new | self._pending.keys()):
+            pid = info["pid"]
+            if pid in self._pending:
+                if _same_create_time(self._pending[pid]["create_time"], info["create_time"]):
+                    continue
+                self._remove(pid)  # reused since the last tick
+            self._add(info)
+            if self.matcher.matches(info, check_age=False):
+                self._pending[pid] = info
+
+        for pid, info in list(self._pending.items()):
+            if self.matcher.is_old_enough(info):
+                roots.append(pid)
+                del self._pending[pid]
+
+        scan_duration = now() - start_time
+        victims = _kill_trees(self._subtree_table(roots), roots, dry=self.dry, timeout=self.timeout) if roots else []
+
+        return WatchTick(self.ticks, time.time(), len(self._infos), len(new), len(gone), victims, scan_duration)
+
+    def watch(self, interval: float, ticks: int = None) -> Iterator[WatchTick]:
+        """Yields the result of a tick every interval seconds (forever or for the given number of ticks)"""
+
+        while ticks is None or self.ticks < ticks:
+            tick_start = now()
+            yield self.tick()
+            time.sleep(max(0.0, interval - (now() - tick_start)))
+
+
+def _get_view_root() -> Path:
+    """Returns the view temp directory of the current user - shared by its processes, private to the others"""
+
+    from tempfile import gettempdir, mkdtemp
+
+    if not hasattr(os, "getuid"):  # the temp dir is per user already
+        return Path(gettempdir()).joinpath("hed_utils_view")
+
+    root = Path(gettempdir()).joinpath(f"hed_utils_view_{os.getuid()}")
+    try:
+        root.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+
+    root_stat = os.lstat(str(root))
+    if stat.S_ISDIR(root_stat.st_mode) and root_stat.st_uid == os.getuid() and not root_stat.st_mode & 0o077:
+        return root
+
+    # taken by another user (or accessible to them) - fall back to a directory private to this process
+    return Path(mkdtemp(prefix="hed_utils_view_"))
+
+
+def _get_view_workspace():
+    """Returns the workspace of the view_file/view_text temp copies (adopting the ones left by previous runs)"""
+
+    global _view_workspace
+
+    if _view_workspace is None:
+        from hed_utils.support.persistence import file_sys
+
+        _view_workspace = file_sys.TmpWorkspace(_get_view_root(), max_age=VIEW_MAX_AGE, max_bytes=VIEW_MAX_BYTES)
+        _view_workspace.scan()
+
+    return _view_workspace
 
 
 @log.call
@@ -154,13 +794,15 @@ def view_file(path, safe=False):
     from subprocess import call
     from functools import partial
 
+    from hed_utils.support.persistence import file_sys
+
     path = (path if isinstance(path, Path) else Path(path)).absolute()
 
     if not path.exists():
         raise FileNotFoundError(path)
 
     if safe:
-        path = file_sys.copy_to_tmp(path)
+        path = file_sys.copy_to_tmp(path, workspace=_get_view_workspace())
 
     @log.call
     def get_view_cmd():
@@ -182,6 +824,11 @@ def view_file(path, safe=False):
 
 @log.call(skip_args=["text"])
 def view_text(text: str):
-    file = file_sys.get_tmp_location("text_view.txt")
+    from hed_utils.support.persistence import file_sys
+
+    workspace = _get_view_workspace()
+    workspace.root.mkdir(parents=True, exist_ok=True)
+    file = file_sys.get_tmp_location("text_view.txt", root=workspace.root)
     file_sys.write_text(text=text, file=file)
-    view_file(file, safe=True)
+    workspace.scan()
+    view_file(file)
@@ -1,9 +1,20 @@
-from . import excel_util
-from . import file_sys
-from . import json_file
+from importlib import import_module
 
 __all__ = [
+    "aio",
     "excel_util",
     "file_sys",
     "json_file",
+    "manifest",
 ]
+
+
+def __getattr__(name):
+    if name in __all__:
+        return import_module(f".{name}", __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
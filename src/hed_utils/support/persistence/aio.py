@@ -0,0 +1,226 @@
+"""asyncio counterparts of the persistence helpers
+
+The blocking work is offloaded to a bounded thread pool (or, optionally, to a process pool for the
+CPU heavy JSON decoding and spreadsheet parsing), so the event loop stays responsive. The number of files
+concurrently opened through this module is limited per event loop (see configure).
+
+A cancellation drops the work if it hasn't started yet, otherwise the worker finishes it in the background -
+except for read_json/write_json in the thread pool, which skip the decoding/writing once cancelled.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator, Callable, Union
+
+from hed_utils.support.persistence import excel_util, file_sys, json_file, manifest
+
+DEFAULT_MAX_WORKERS = 8
+
+DEFAULT_MAX_OPEN_FILES = 16
+
+DEFAULT_BATCH_SIZE = 1000
+
+_lock = threading.Lock()
+
+_config = {
+    "max_workers": DEFAULT_MAX_WORKERS,
+    "max_open_files": DEFAULT_MAX_OPEN_FILES,
+    "process_workers": None,
+}
+
+_thread_pool = None
+
+_process_pool = None
+
+_open_files_limits = weakref.WeakKeyDictionary()
+
+
+def configure(*, max_workers=DEFAULT_MAX_WORKERS, max_open_files=DEFAULT_MAX_OPEN_FILES, process_workers=None):
+    """Sets up the executors used by this module (the current ones are shut down without waiting)
+
+    Args:
+        max_workers(int):       the size of the thread pool running the blocking I/O
+        max_open_files(int):    the max number of files concurrently processed per event loop
+        process_workers(int):   when set - the JSON files are decoded and the spreadsheets are parsed by a
+                                process pool of that size
+    """
+
+    if max_workers < 1 or max_open_files < 1 or (process_workers is not None and process_workers < 1):
+        raise ValueError(f"the limits must be positive! ({max_workers}, {max_open_files}, {process_workers})")
+
+    shutdown(wait=False)
+
+    with _lock:
+        _config.update(max_workers=max_workers, max_open_files=max_open_files, process_workers=process_workers)
+        _open_files_limits.clear()
+
+
+def shutdown(wait=True):
+    """Shuts down the executors - they are re-created on the next call"""
+
+    global _thread_pool, _process_pool
+
+    with _lock:
+        pools, _thread_pool, _process_pool = (_thread_pool, _process_pool), None, None
+
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=_config["max_workers"], thread_name_prefix="aio")
+        return _thread_pool
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+
+    with _lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=_config["process_workers"])
+        return _process_pool
+
+
+def _get_open_files_limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+
+    with _lock:
+        if loop not in _open_files_limits:
+            _open_files_limits[loop] = asyncio.Semaphore(_config["max_open_files"])
+        return _open_files_limits[loop]
+
+
+async def _run(func: Callable, *args, use_processes=False, **kwargs):
+    async with _get_open_files_limit():
+        executor = _get_process_pool() if use_processes else _get_thread_pool()
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+async def _run_cancellable(func: Callable, *args, **kwargs):
+    """Runs func(*args, cancelled=threading.Event, **kwargs) in the thread pool, setting the event on cancellation"""
+
+    cancelled = threading.Event()
+    try:
+        return await _run(func, *args, cancelled=cancelled, **kwargs)
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+async def read_json(file: str, *, use_processes: bool = None):
+    """Awaitable json_file.read_json - decoded in the process pool if configured with process_workers"""
+
+    use_processes = (_config["process_workers"] is not None) if use_processes is None else use_processes
+    if use_processes:
+        return await _run(json_file.read_json, str(file), use_processes=True)
+    return await _run_cancellable(json_file.read_json, file)
+
+
+async def write_json(obj, file: str):
+    """Awaitable json_file.write_json"""
+
+    return await _run_cancellable(json_file.write_json, obj, file)
+
+
+async def read_sheets(file: str, *, use_processes: bool = None):
+    """Awaitable excel_util.read_sheets - parsed in the process pool if configured with process_workers"""
+
+    use_processes = (_config["process_workers"] is not None) if use_processes is None else use_processes
+    return await _run(excel_util.read_sheets, str(file), use_processes=use_processes)
+
+
+async def write_sheets(sheets, file: str):
+    """Awaitable excel_util.write_sheets"""
+
+    return await _run(excel_util.write_sheets, sheets, file)
+
+
+async def copy(src_path: str, dst_path: str, overwrite=False, **kwargs):
+    """Awaitable file_sys.copy (the keyword args are passed through)"""
+
+    return await _run(file_sys.copy, src_path, dst_path, overwrite, **kwargs)
+
+
+async def delete(path: Union[str, Path], **kwargs):
+    """Awaitable file_sys.delete (the keyword args are passed through)"""
+
+    return await _run(file_sys.delete, path, **kwargs)
+
+
+async def build_manifest(path: Union[str, Path], manifest_file: Union[str, Path] = None, **kwargs):
+    """Awaitable manifest.build_manifest (the keyword args are passed through)"""
+
+    return await _run(manifest.build_manifest, path, manifest_file, **kwargs)
+
+
+async def update_manifest(path: Union[str, Path], manifest_file: Union[str, Path] = None, **kwargs):
+    """Awaitable manifest.update_manifest (the keyword args are passed through)"""
+
+    return await _run(manifest.update_manifest, path, manifest_file, **kwargs)
+
+
+def _next_batch(iterator, batch_size: int) -> list:
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+async def _iterate(iterator_factory: Callable, batch_size: int) -> AsyncIterator:
+    """Pulls the items of a blocking iterator in batches from the thread pool
+
+    The open files limit is held while iterating. The blocking iterator is closed on exit (and cancellation).
+    """
+
+    executor = _get_thread_pool()
+
+    async with _get_open_files_limit():
+        iterator = await asyncio.get_running_loop().run_in_executor(executor, iterator_factory)
+        future = None
+        try:
+            while True:
+                future = executor.submit(_next_batch, iterator, batch_size)
+                batch = await asyncio.wrap_future(future)
+                for item in batch:
+                    yield item
+                if len(batch) < batch_size:
+                    break
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                # a generator can't be closed while a worker is still pulling a batch from it
+                if future is None or future.done():
+                    executor.submit(close)
+                else:
+                    future.add_done_callback(lambda _: close())
+
+
+def iter_manifest(manifest_file: Union[str, Path], *, batch_size=DEFAULT_BATCH_SIZE) -> AsyncIterator:
+    """Async iterator over manifest.read_manifest"""
+
+    return _iterate(partial(manifest.read_manifest, manifest_file), batch_size)
+
+
+def iter_manifest_diff(old_file: Union[str, Path],
+                       new_file: Union[str, Path],
+                       *,
+                       batch_size=DEFAULT_BATCH_SIZE) -> AsyncIterator:
+    """Async iterator over manifest.diff_manifests"""
+
+    return _iterate(partial(manifest.diff_manifests, old_file, new_file), batch_size)
+
+
+def iter_duplicates(manifest_file: Union[str, Path], *, partitions=16, batch_size=DEFAULT_BATCH_SIZE) -> AsyncIterator:
+    """Async iterator over manifest.find_duplicates"""
+
+    return _iterate(partial(manifest.find_duplicates, manifest_file, partitions=partitions), batch_size)
@@ -1,13 +1,31 @@
 from pathlib import Path
 from typing import List, Dict, Union
 
-from xlrd import open_workbook
-from xlwt import XFStyle, Workbook
-
 from hed_utils.support import log
 
-FLOAT_FMT = XFStyle()
-FLOAT_FMT.num_format_str = "##0.00"
+FLOAT_NUM_FORMAT = "##0.00"
+
+_float_fmt = None
+
+
+def _get_float_fmt():
+    global _float_fmt
+
+    if _float_fmt is None:
+        from xlwt import XFStyle
+
+        _float_fmt = XFStyle()
+        _float_fmt.num_format_str = FLOAT_NUM_FORMAT
+
+    return _float_fmt
+
+
+def __getattr__(name):
+    # xlwt is imported on first use - FLOAT_FMT is kept for backwards compatibility
+    if name == "FLOAT_FMT":
+        return _get_float_fmt()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @log.call(skip_args=["sheets"])
@@ -27,8 +45,11 @@ def write_sheets(sheets: Dict[str, List[Dict[str, Union[int, float, str]]]], fil
 
     """
 
+    from xlwt import Workbook
+
     dst_path = str(Path(file if file.endswith(".xlsx") else f"{file}.xlsx").absolute())
 
+    float_fmt = _get_float_fmt()
     output_workbook = Workbook()
 
     for sheet_name, sheet_records in sheets.items():
@@ -47,7 +68,7 @@ def write_sheets(sheets: Dict[str, List[Dict[str, Union[int, float, str]]]], fil
             for column_index, column_name in enumerate(columns):
                 value = record[column_name]
                 if isinstance(value, float):
-                    sheet.write(row_index + 1, column_index, value, FLOAT_FMT)
+                    sheet.write(row_index + 1, column_index, value, float_fmt)
                 else:
                     sheet.write(row_index + 1, column_index, value)
 
@@ -58,6 +79,8 @@ def write_sheets(sheets: Dict[str, List[Dict[str, Union[int, float, str]]]], fil
 
 @log.call(log_result=False)
 def read_sheets(file: str) -> Dict[str, List[Dict[str, Union[int, float, str]]]]:
+    from xlrd import open_workbook
+
     file = str(Path(file).absolute())
     result = dict()
 
@@ -1,11 +1,50 @@
+import errno
+import hashlib
+import itertools
+import os
+import shutil
+import stat
+import sys
+import threading
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from pathlib import Path
 from shutil import copyfile, copytree
 from tempfile import gettempdir
-from typing import Union
+from timeit import default_timer as now
+from typing import Union, Tuple, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
 
 from hed_utils.support import log
 
+DeleteReport = namedtuple("DeleteReport", "files dirs bytes duration")
+
+SyncReport = namedtuple("SyncReport", "copied skipped deleted bytes duration")
+
+Snapshot = namedtuple("Snapshot", "path mode bytes created")
+
+_DIR_FD_SUPPORTED = ({os.open, os.stat, os.unlink, os.rmdir} <= os.supports_dir_fd) and (os.scandir in os.supports_fd)
+
+_DIR_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+
+_IS_WINDOWS = os.name == "nt"
+
+_COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# ioctl request for cloning a file (copy-on-write) on Linux (btrfs, xfs, ...)
+_FICLONE = 0x40049409 if sys.platform.startswith("linux") else None
+
+_reflink_unsupported_devices = set()
+
+_tmp_counter = itertools.count()
+
+_KERNEL_COPY_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY)
+
 
 @log.call
 def get_utc_timestamp() -> str:
@@ -13,14 +52,108 @@ def get_utc_timestamp() -> str:
 
 
 @log.call
-def get_tmp_location(path) -> str:
+def get_tmp_location(path, root=None) -> str:
+    """Returns a new unique path (in the temp dir by default) named after the given path
+
+    The name is unique even for concurrent callers - it includes the pid and a per-process counter
+    """
+
     path = path if isinstance(path, Path) else Path(path)
-    tmp_name = path.stem + "_tmp_" + get_utc_timestamp() + path.suffix
-    return str(Path(gettempdir()).joinpath(tmp_name))
+    tmp_name = f"{path.stem}_tmp_{get_utc_timestamp()}_{os.getpid()}_{next(_tmp_counter)}{path.suffix}"
+    return str(Path(root or gettempdir()).joinpath(tmp_name))
+
+
+def _kernel_copy(copy_func, src_fd: int, dst_fd: int, size: int) -> bool:
+    """Copies size bytes between the fds with a kernel side copy function. Returns False if it is not supported"""
+
+    offset = 0
+    try:
+        while offset < size:
+            sent = copy_func(src_fd, dst_fd, min(_COPY_CHUNK_SIZE, size - offset), offset)
+            if sent == 0:
+                break
+            offset += sent
+    except OSError as error:
+        if offset == 0 and error.errno in _KERNEL_COPY_ERRORS:
+            return False
+        raise
+
+    return True
+
+
+def _copy_file(src: str, dst: str, src_stat: os.stat_result):
+    """Copies the file contents (kernel side where possible), permissions and timestamps
+
+    The copy is written to a temp file next to dst that replaces it when complete - readers of dst never see
+    a partial file and the other hardlinks of an existing dst are left untouched.
+    """
+
+    dst_dir, dst_name = os.path.split(dst)
+    tmp_file = os.path.join(dst_dir, f".{dst_name}.{os.getpid()}_{next(_tmp_counter)}.tmp")
+
+    try:
+        with open(src, "rb") as src_file, open(tmp_file, "wb") as dst_file:
+            src_fd, dst_fd = src_file.fileno(), dst_file.fileno()
+            copied = False
+
+            if hasattr(os, "copy_file_range"):
+                copied = _kernel_copy(lambda i, o, count, offset: os.copy_file_range(i, o, count, offset, offset),
+                                      src_fd, dst_fd, src_stat.st_size)
+
+            if not copied and hasattr(os, "sendfile") and not _IS_WINDOWS:
+                copied = _kernel_copy(lambda i, o, count, offset: os.sendfile(o, i, offset, count),
+                                      src_fd, dst_fd, src_stat.st_size)
+
+            if not copied:
+                shutil.copyfileobj(src_file, dst_file, _COPY_CHUNK_SIZE)
+
+        os.chmod(tmp_file, stat.S_IMODE(src_stat.st_mode))
+        os.utime(tmp_file, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        os.replace(tmp_file, dst)
+
+    finally:
+        if os.path.exists(tmp_file):
+            os.unlink(tmp_file)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.blake2b()
+    with open(path, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(_COPY_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_up_to_date(src: str, src_stat: os.stat_result, dst: str, dst_stat: os.stat_result, checksum: bool) -> bool:
+    if not stat.S_ISREG(dst_stat.st_mode) or src_stat.st_size != dst_stat.st_size:
+        return False
+
+    if checksum:
+        return _file_digest(src) == _file_digest(dst)
+
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
 
 
 @log.call
-def copy(src_path: str, dst_path: str, overwrite=False) -> str:
+def copy(src_path: str, dst_path: str, overwrite=False, *, sync=False, workers=None, checksum=False):
+    """Copies a file or a directory tree
+
+    Args:
+        src_path(str):      the file or directory to be copied
+        dst_path(str):      the destination path
+        overwrite(bool):    replace the destination if it exists (ignored in sync mode)
+        sync(bool):         incrementally sync the destination with the source - see sync_tree
+        workers(int):       the number of copy threads in sync mode
+        checksum(bool):     compare the files by content hash instead of mtime in sync mode
+
+    Returns:
+        obj(str):           the destination path, or
+        obj(SyncReport):    in sync mode
+    """
+
+    if sync:
+        return sync_tree(src_path, dst_path, workers=workers, checksum=checksum)
+
     src_path, dst_path = Path(src_path), Path(dst_path)
     src_path, dst_path = src_path.absolute(), dst_path.absolute()
 
@@ -38,28 +171,365 @@ def copy(src_path: str, dst_path: str, overwrite=False) -> str:
     return copy_path
 
 
+def _reflink(src: str, dst: str, src_stat: os.stat_result, dst_dev: int) -> bool:
+    """Attempts a copy-on-write clone of src to dst. Returns False (leaving no dst behind) if not supported"""
+
+    devices = (src_stat.st_dev, dst_dev)
+    if (fcntl is None) or (_FICLONE is None) or (devices in _reflink_unsupported_devices):
+        return False
+
+    with open(src, "rb") as src_file, open(dst, "xb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+            cloned = True
+        except OSError as error:
+            if error.errno in _KERNEL_COPY_ERRORS + (errno.ENOTTY,):
+                _reflink_unsupported_devices.add(devices)
+            cloned = False
+
+    if not cloned:
+        os.unlink(dst)
+        return False
+
+    os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+    os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    return True
+
+
+def _snapshot_file(src: str, dst: str, src_stat: os.stat_result, dst_dev: int, readonly: bool) -> str:
+    if _reflink(src, dst, src_stat, dst_dev):
+        return "reflink"
+
+    if readonly:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+
+    _copy_file(src, dst, src_stat)
+    return "copy"
+
+
 @log.call
-def copy_to_tmp(src_path) -> str:
-    dst = get_tmp_location(src_path)
-    return copy(str(src_path), str(dst), overwrite=True)
+def snapshot(src_path: Union[str, Path], dst_path: Union[str, Path], *, readonly=False) -> Snapshot:
+    """Creates a point-in-time copy of a file or directory using the cheapest available method
+
+    Tries (per file) a reflink (copy-on-write clone) where the filesystem supports it,
+    then a hardlink - only if readonly=True as the link shares the data with the source,
+    and finally falls back to a real copy. Symlinks inside a directory are copied as symlinks,
+    special files (FIFOs, sockets, devices) are skipped. Nothing is left at dst_path on failure.
+
+    Args:
+        src_path(str|Path):     the file or directory to snapshot
+        dst_path(str|Path):     the snapshot location (must not exist)
+        readonly(bool):         the snapshot won't be modified and may share data with the source via hardlinks
+
+    Returns:
+        obj(Snapshot):          the snapshot path, the most expensive mode used ('reflink' < 'hardlink' < 'copy'),
+                                the bytes actually copied and the creation time
+    """
+
+    src_path, dst_path = os.path.abspath(str(src_path)), os.path.abspath(str(dst_path))
+    src_stat = os.stat(src_path)
+
+    if not (stat.S_ISDIR(src_stat.st_mode) or stat.S_ISREG(src_stat.st_mode)):
+        raise ValueError(f"Can only snapshot a regular file or a directory! ({src_path})")
+
+    if os.path.lexists(dst_path):
+        raise FileExistsError(dst_path)
+
+    dst_dev = os.stat(os.path.dirname(dst_path)).st_dev
+    modes = set()
+    size = 0
+
+    try:
+        if stat.S_ISDIR(src_stat.st_mode):
+            os.mkdir(dst_path)
+            dirs = [(src_path, dst_path)]
+            while dirs:
+                src_dir, dst_dir = dirs.pop()
+                with os.scandir(src_dir) as it:
+                    for entry in it:
+                        dst = os.path.join(dst_dir, entry.name)
+                        if entry.is_symlink():
+                            os.symlink(os.readlink(entry.path), dst)
+                        elif entry.is_dir(follow_symlinks=False):
+                            os.mkdir(dst)
+                            dirs.append((entry.path, dst))
+                        elif entry.is_file(follow_symlinks=False):
+                            entry_stat = entry.stat(follow_symlinks=False)
+                            mode = _snapshot_file(entry.path, dst, entry_stat, dst_dev, readonly)
+                            modes.add(mode)
+                            size += entry_stat.st_size if mode == "copy" else 0
+        else:
+            mode = _snapshot_file(src_path, dst_path, src_stat, dst_dev, readonly)
+            modes.add(mode)
+            size += src_stat.st_size if mode == "copy" else 0
+    except BaseException:
+        if os.path.lexists(dst_path):
+            delete(dst_path)
+        raise
+
+    mode = next((mode for mode in ("copy", "hardlink", "reflink") if mode in modes), "reflink")
+    return Snapshot(dst_path, mode, size, datetime.now().timestamp())
+
+
+def _tree_size(path: str) -> int:
+    size = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            size += os.lstat(os.path.join(dir_path, file_name)).st_size
+    return size
+
+
+class TmpWorkspace:
+    """A temp directory tracking the snapshots created in it and cleaning them up by age and size budget
+
+    Only the bytes actually copied count towards the size budget (reflinks and hardlinks share the source data).
+    Can be used as a context manager - all the tracked snapshots get deleted on exit.
+    """
+
+    def __init__(self, root: Union[str, Path] = None, *, max_age: float = None, max_bytes: int = None):
+        self.root = Path(root) if root else Path(gettempdir()).joinpath("hed_utils_tmp")
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup(everything=True)
+
+    @property
+    def snapshots(self) -> List[Snapshot]:
+        with self._lock:
+            return list(self._snapshots.values())
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(item.bytes for item in self._snapshots.values())
+
+    def snapshot(self, src_path: Union[str, Path], *, readonly=False) -> str:
+        self.root.mkdir(parents=True, exist_ok=True)
+        item = snapshot(src_path, get_tmp_location(src_path, root=self.root), readonly=readonly)
+
+        with self._lock:
+            self._snapshots[item.path] = item
+
+        self.cleanup(keep=item.path)
+        return item.path
+
+    def scan(self) -> List[Snapshot]:
+        """Starts tracking the entries of the root that are not tracked yet (e.g. left by a previous run)
+
+        Only the entries owned by the current user are adopted (where the platform has owners). The found
+        entries are tracked by their mtime as creation time and then the budget is enforced.
+        """
+
+        if not self.root.is_dir():
+            return []
+
+        with self._lock:
+            tracked = set(self._snapshots)
+
+        uid = os.getuid() if hasattr(os, "getuid") else None
+        found = []
+        with os.scandir(str(self.root)) as it:
+            for entry in it:
+                if entry.path in tracked:
+                    continue
+                entry_stat = entry.stat(follow_symlinks=False)
+                if uid is not None and entry_stat.st_uid != uid:
+                    continue
+                size = _tree_size(entry.path) if entry.is_dir(follow_symlinks=False) else entry_stat.st_size
+                found.append(Snapshot(entry.path, "found", size, entry_stat.st_mtime))
+
+        with self._lock:
+            # keep the snapshots in creation order - the cleanup relies on it
+            items = sorted(list(self._snapshots.values()) + found, key=lambda item: item.created)
+            self._snapshots = OrderedDict((item.path, item) for item in items)
+
+        self.cleanup()
+        return found
+
+    def cleanup(self, *, everything=False, keep: str = None) -> List[str]:
+        """Deletes the snapshots that are over the age/size budget (or all of them) and returns their paths"""
+
+        with self._lock:
+            victims = []
+            created_limit = (datetime.now().timestamp() - self.max_age) if self.max_age is not None else None
+            total_bytes = sum(item.bytes for item in self._snapshots.values())
+
+            # snapshots are kept in creation order - the oldest are the first to go
+            for item in self._snapshots.values():
+                if item.path == keep:
+                    continue
+
+                over_age = (created_limit is not None) and (item.created < created_limit)
+                over_size = (self.max_bytes is not None) and (total_bytes > self.max_bytes)
+
+                if everything or over_age or over_size:
+                    victims.append(item)
+                    total_bytes -= item.bytes
+
+            for item in victims:
+                del self._snapshots[item.path]
+
+        for item in victims:
+            if os.path.lexists(item.path):
+                delete(item.path)
+
+        return [item.path for item in victims]
 
 
 @log.call
-def delete(path: Union[str, Path]):
-    path = (path if isinstance(path, Path) else Path(path)).absolute()
+def copy_to_tmp(src_path, *, readonly=False, workspace: TmpWorkspace = None) -> str:
+    """Snapshots the file/directory into a new unique temp location (see snapshot) and returns its path"""
+
+    if workspace is not None:
+        return workspace.snapshot(src_path, readonly=readonly)
+
+    return snapshot(src_path, get_tmp_location(src_path), readonly=readonly).path
+
+
+def _delete_entries_fd(dir_fd: int) -> Tuple[int, int, int]:
+    """Deletes the contents of an open directory, all operations relative to its fd. Returns (files, dirs, bytes)"""
+
+    files = dirs = size = 0
+
+    with os.scandir(dir_fd) as it:
+        entries = list(it)
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            child_files, child_dirs, child_size = _delete_subtree_fd(dir_fd, entry.name)
+            files, dirs, size = files + child_files, dirs + child_dirs, size + child_size
+        else:
+            size += entry.stat(follow_symlinks=False).st_size
+            os.unlink(entry.name, dir_fd=dir_fd)
+            files += 1
+
+    return files, dirs, size
+
+
+def _delete_subtree_fd(parent_fd: int, name: str) -> Tuple[int, int, int]:
+    dir_fd = os.open(name, _DIR_OPEN_FLAGS, dir_fd=parent_fd)
+    try:
+        files, dirs, size = _delete_entries_fd(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+    os.rmdir(name, dir_fd=parent_fd)
+    return files, dirs + 1, size
+
 
-    if not path.exists():
-        raise FileNotFoundError(str(path))
+def _delete_entries(path: str) -> Tuple[int, int, int]:
+    """Path based fallback of _delete_entries_fd for platforms without dir_fd support (Windows)"""
 
-    if path.is_file():
-        path.unlink()
-        return
+    files = dirs = size = 0
 
-    if path.is_dir():
-        for child_path in path.iterdir():
-            delete(child_path)
+    with os.scandir(path) as it:
+        entries = list(it)
 
-        path.rmdir()
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            child_files, child_dirs, child_size = _delete_subtree(entry.path)
+            files, dirs, size = files + child_files, dirs + child_dirs, size + child_size
+        else:
+            size += entry.stat(follow_symlinks=False).st_size
+            os.unlink(entry.path)
+            files += 1
+
+    return files, dirs, size
+
+
+def _delete_subtree(path: str) -> Tuple[int, int, int]:
+    files, dirs, size = _delete_entries(path)
+    os.rmdir(path)
+    return files, dirs + 1, size
+
+
+def _delete_dir_parallel(path: str, workers: int) -> Tuple[int, int, int]:
+    """Deletes the files of the directory in place and fans out its sub-directories across a thread pool"""
+
+    files = dirs = size = 0
+    dir_fd = os.open(path, _DIR_OPEN_FLAGS) if _DIR_FD_SUPPORTED else None
+
+    try:
+        with os.scandir(path if dir_fd is None else dir_fd) as it:
+            entries = list(it)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file_sys.delete") as executor:
+            futures = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if dir_fd is None:
+                        futures.append(executor.submit(_delete_subtree, entry.path))
+                    else:
+                        futures.append(executor.submit(_delete_subtree_fd, dir_fd, entry.name))
+                else:
+                    size += entry.stat(follow_symlinks=False).st_size
+                    if dir_fd is None:
+                        os.unlink(entry.path)
+                    else:
+                        os.unlink(entry.name, dir_fd=dir_fd)
+                    files += 1
+
+            for future in futures:
+                child_files, child_dirs, child_size = future.result()
+                files, dirs, size = files + child_files, dirs + child_dirs, size + child_size
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+
+    os.rmdir(path)
+    return files, dirs + 1, size
+
+
+@log.call
+def delete(path: Union[str, Path], *, workers: int = None) -> DeleteReport:
+    """Deletes a file or a whole directory tree and returns a summary of what has been removed
+
+    The tree is walked with os.scandir, re-using the entry type info instead of stat-ing every path,
+    and (where supported) all unlink/rmdir calls are made relative to the parent directory fd.
+    Symlinks are removed, never followed.
+
+    Args:
+        path(str|Path):     the file or directory to be deleted
+        workers(int):       when > 1 - the top level sub-directories are deleted concurrently by that many threads
+
+    Returns:
+        obj(DeleteReport):  the count of deleted files and dirs, their total size in bytes and the duration in seconds
+    """
+
+    start_time = now()
+    path = os.path.abspath(str(path))
+
+    try:
+        path_stat = os.lstat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(path) from None
+
+    if not stat.S_ISDIR(path_stat.st_mode):
+        os.unlink(path)
+        files, dirs, size = 1, 0, path_stat.st_size
+    elif workers and workers > 1:
+        files, dirs, size = _delete_dir_parallel(path, workers)
+    elif _DIR_FD_SUPPORTED:
+        parent, name = os.path.split(path)
+        parent_fd = os.open(parent, _DIR_OPEN_FLAGS & ~getattr(os, "O_NOFOLLOW", 0))
+        try:
+            files, dirs, size = _delete_subtree_fd(parent_fd, name)
+        finally:
+            os.close(parent_fd)
+    else:
+        files, dirs, size = _delete_subtree(path)
+
+    return DeleteReport(files, dirs, size, now() - start_time)
 
 
 @log.call
@@ -73,3 +543,167 @@ def write_text(*, text: str, file: str):
     path = Path(file).absolute()
     with path.open("wb") as out:
         return out.write(text.encode("utf-8"))
+
+
+def _delete_path(path: str, path_stat: os.stat_result):
+    if stat.S_ISDIR(path_stat.st_mode):
+        delete(path)
+    else:
+        os.unlink(path)
+
+
+def _sync_symlink(src: str, dst: str, dst_stat: Optional[os.stat_result]) -> bool:
+    """Makes dst a symlink with the same target as src - returns False if it already was one"""
+
+    target = os.readlink(src)
+    if dst_stat is not None:
+        if stat.S_ISLNK(dst_stat.st_mode) and os.readlink(dst) == target:
+            return False
+        _delete_path(dst, dst_stat)
+    os.symlink(target, dst)
+    return True
+
+
+@log.call
+def sync_tree(src_path: Union[str, Path],
+              dst_path: Union[str, Path],
+              *,
+              workers: int = None,
+              checksum=False,
+              delete_stale=True) -> SyncReport:
+    """Makes the destination a copy of the source, touching only the entries that differ
+
+    Files with equal size and mtime (or content hash when checksum=True) are skipped,
+    the rest are copied concurrently by a thread pool using kernel side copying where available.
+    Symlinks are copied as symlinks (never followed), special files (FIFOs, sockets, devices) are skipped.
+    Destination entries missing in the source are deleted.
+
+    Args:
+        src_path(str|Path):     the source file or directory
+        dst_path(str|Path):     the destination - created if missing
+        workers(int):           the number of copy threads (defaults to the ThreadPoolExecutor default)
+        checksum(bool):         compare equally sized files by content hash instead of mtime
+        delete_stale(bool):     delete the destination entries that are not present in the source
+
+    Returns:
+        obj(SyncReport):        the copied/skipped/deleted entries counts, the copied bytes and the duration in seconds
+    """
+
+    start_time = now()
+    src_path, dst_path = os.path.abspath(str(src_path)), os.path.abspath(str(dst_path))
+
+    if not os.path.exists(src_path):
+        raise FileNotFoundError(src_path)
+
+    copied = skipped = deleted = size = 0
+
+    if not os.path.isdir(src_path):
+        src_stat = os.stat(src_path)
+        if not stat.S_ISREG(src_stat.st_mode):
+            raise ValueError(f"Can only sync a regular file or a directory! ({src_path})")
+        try:
+            dst_stat = os.stat(dst_path)
+        except FileNotFoundError:
+            dst_stat = None
+
+        if dst_stat is not None and _is_up_to_date(src_path, src_stat, dst_path, dst_stat, checksum):
+            skipped += 1
+        else:
+            if dst_stat is not None and stat.S_ISDIR(dst_stat.st_mode):
+                delete(dst_path)
+                deleted += 1
+            _copy_file(src_path, dst_path, src_stat)
+            copied, size = 1, src_stat.st_size
+
+        return SyncReport(copied, skipped, deleted, size, now() - start_time)
+
+    if os.path.exists(dst_path) and not os.path.isdir(dst_path):
+        os.unlink(dst_path)
+        deleted += 1
+    os.makedirs(dst_path, exist_ok=True)
+
+    # (src, dst) of the synced directories - their mode and timestamps are copied once their contents are synced
+    synced_dirs = [(src_path, dst_path)]
+
+    def sync_file(src, src_stat, dst, dst_stat):
+        if dst_stat is not None and _is_up_to_date(src, src_stat, dst, dst_stat, checksum):
+            return False
+        _copy_file(src, dst, src_stat)
+        return True
+
+    def collect(done_futures):
+        nonlocal copied, skipped, size
+        for future in done_futures:
+            file_size = pending.pop(future)
+            if future.result():
+                copied, size = copied + 1, size + file_size
+            else:
+                skipped += 1
+
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    max_pending = 64 * workers
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file_sys.sync") as executor:
+        pending = dict()
+        dirs = [(src_path, dst_path)]
+
+        while dirs:
+            src_dir, dst_dir = dirs.pop()
+
+            with os.scandir(dst_dir) as it:
+                dst_entries = {entry.name: entry for entry in it}
+
+            with os.scandir(src_dir) as it:
+                for src_entry in it:
+                    is_link = src_entry.is_symlink()
+                    if not (is_link or src_entry.is_dir(follow_symlinks=False)
+                            or src_entry.is_file(follow_symlinks=False)):
+                        continue  # a special file - the destination entry is stale
+
+                    dst_entry = dst_entries.pop(src_entry.name, None)
+                    dst = os.path.join(dst_dir, src_entry.name)
+                    dst_stat = dst_entry.stat(follow_symlinks=False) if dst_entry is not None else None
+
+                    if is_link:
+                        if _sync_symlink(src_entry.path, dst, dst_stat):
+                            copied += 1
+                            if dst_stat is not None:
+                                deleted += 1
+                        else:
+                            skipped += 1
+                        continue
+
+                    if src_entry.is_dir(follow_symlinks=False):
+                        if dst_stat is not None and not stat.S_ISDIR(dst_stat.st_mode):
+                            os.unlink(dst)
+                            deleted += 1
+                            dst_stat = None
+                        if dst_stat is None:
+                            os.mkdir(dst)
+                        dirs.append((src_entry.path, dst))
+                        synced_dirs.append((src_entry.path, dst))
+                        continue
+
+                    if dst_stat is not None and not stat.S_ISREG(dst_stat.st_mode):
+                        _delete_path(dst, dst_stat)
+                        deleted += 1
+                        dst_stat = None
+
+                    src_stat = src_entry.stat(follow_symlinks=False)
+                    pending[executor.submit(sync_file, src_entry.path, src_stat, dst, dst_stat)] = src_stat.st_size
+
+                    if len(pending) >= max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+
+            if delete_stale:
+                for dst_entry in dst_entries.values():
+                    _delete_path(dst_entry.path, dst_entry.stat(follow_symlinks=False))
+                    deleted += 1
+
+        collect(list(pending))
+
+    for src_dir, dst_dir in reversed(synced_dirs):
+        shutil.copystat(src_dir, dst_dir)
+
+    return SyncReport(copied, skipped, deleted, size, now() - start_time)
@@ -1,20 +1,40 @@
+import threading
 from json import dumps, loads
 from pathlib import Path
 
 from hed_utils.support import log
 
 
-@log.call
-def read_json(file: str):
+class Cancelled(Exception):
+    """Stops a read_json/write_json whose 'cancelled' event is set"""
+
+
+def _check(cancelled: threading.Event):
+    if cancelled is not None and cancelled.is_set():
+        raise Cancelled()
+
+
+@log.call(log_result=False)
+def read_json(file: str, *, cancelled: threading.Event = None):
+    """Returns the decoded content of the file - raises Cancelled instead of decoding it if 'cancelled' is set"""
+
     path = Path(file).absolute()
     log.debug(f"reading json file: {str(path)}")
     with path.open("rb") as in_file:
-        return loads(in_file.read().decode(encoding="utf-8"))
+        text = in_file.read().decode(encoding="utf-8")
+
+    _check(cancelled)
+    return loads(text)
 
 
-@log.call
-def write_json(obj, file: str):
+@log.call(skip_args=["obj"])
+def write_json(obj, file: str, *, cancelled: threading.Event = None):
+    """Writes obj to the file - raises Cancelled before touching the file if 'cancelled' is set once obj is encoded"""
+
     path = Path(file).absolute()
     log.debug(f"writing ({type(obj).__name__}) to json file: {str(path)}")
+    data = dumps(obj).encode(encoding="utf-8")
+
+    _check(cancelled)
     with path.open("wb") as out_file:
-        out_file.write(dumps(obj).encode(encoding="utf-8"))
+        out_file.write(data)
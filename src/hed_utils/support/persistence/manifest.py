@@ -0,0 +1,286 @@
+"""Directory manifests - a persisted (JSON Lines) listing of the files in a tree with their size, mtime and hash
+
+The entries are always kept in the tree walk order (depth first, siblings sorted by name),
+so manifests can be updated and compared by streaming them side by side with bounded memory.
+
+Symlinks are not followed - they are listed with 'symlink:<target>' as digest (and the target length as size).
+Other special files (FIFOs, sockets, devices) are skipped.
+"""
+import hashlib
+import json
+import mmap
+import os
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from timeit import default_timer as now
+from typing import Iterator, List, Optional, Tuple, Union
+
+from hed_utils.support import log
+
+ManifestEntry = namedtuple("ManifestEntry", "path size mtime_ns digest")
+
+ManifestChange = namedtuple("ManifestChange", "path change old new")
+
+ManifestReport = namedtuple("ManifestReport", "file files hashed bytes duration")
+
+MANIFEST_VERSION = 1
+
+DEFAULT_ALGORITHM = "blake2b"
+
+SYMLINK_DIGEST_PREFIX = "symlink:"
+
+_CHUNK_SIZE = 1024 * 1024
+
+_encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+def _sort_key(path: str) -> Tuple[str, ...]:
+    return tuple(path.split("/"))
+
+
+def _sorted_entries(path: str) -> List[os.DirEntry]:
+    with os.scandir(path) as it:
+        return sorted(it, key=lambda entry: entry.name)
+
+
+def _walk(root: str) -> Iterator[Tuple[str, os.stat_result, Optional[str]]]:
+    """Yields (relative posix path, stat, known digest) for every file and symlink under root in the manifest order
+
+    Depth first with the siblings sorted by name - only the listings along the current branch are held in memory.
+    The digest is known only for the symlinks (the link target), the regular files are to be hashed.
+    """
+
+    stack = [("", iter(_sorted_entries(root)))]
+
+    while stack:
+        rel_dir, entries = stack[-1]
+        entry = next(entries, None)
+
+        if entry is None:
+            stack.pop()
+        elif entry.is_symlink():
+            yield f"{rel_dir}{entry.name}", entry.stat(follow_symlinks=False), \
+                f"{SYMLINK_DIGEST_PREFIX}{os.readlink(entry.path)}"
+        elif entry.is_dir(follow_symlinks=False):
+            stack.append((f"{rel_dir}{entry.name}/", iter(_sorted_entries(entry.path))))
+        elif entry.is_file(follow_symlinks=False):
+            yield f"{rel_dir}{entry.name}", entry.stat(follow_symlinks=False), None
+
+
+def hash_file(path: Union[str, Path], algorithm: str = DEFAULT_ALGORITHM, use_mmap=False) -> str:
+    """Returns the hex digest of the file contents, read in chunks (or mapped in memory with use_mmap=True)"""
+
+    digest = hashlib.new(algorithm)
+
+    with open(path, "rb") as in_file:
+        if use_mmap:
+            try:
+                with mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+                return digest.hexdigest()
+            except ValueError:  # empty files can't be mapped
+                return digest.hexdigest()
+
+        read_into = in_file.readinto
+        buffer = bytearray(_CHUNK_SIZE)
+        view = memoryview(buffer)
+        size = read_into(buffer)
+        while size:
+            digest.update(view[:size])
+            size = read_into(buffer)
+
+    return digest.hexdigest()
+
+
+def read_manifest(manifest_file: Union[str, Path]) -> Iterator[ManifestEntry]:
+    """Streams the entries of a manifest file (the header line is skipped)"""
+
+    with open(manifest_file, "r", encoding="utf-8") as in_file:
+        for line in in_file:
+            record = json.loads(line)
+            if "manifest" in record:
+                continue
+            yield ManifestEntry(record["path"], record["size"], record["mtime_ns"], record["digest"])
+
+
+def read_manifest_header(manifest_file: Union[str, Path]) -> dict:
+    with open(manifest_file, "r", encoding="utf-8") as in_file:
+        return json.loads(in_file.readline())
+
+
+def _default_manifest_file(path: str) -> str:
+    return f"{path.rstrip(os.sep)}.manifest.jsonl"
+
+
+def _write_manifest(root: str,
+                    manifest_file: str,
+                    entries: Iterator[Tuple[str, os.stat_result, Optional[str]]],
+                    *,
+                    workers: int,
+                    algorithm: str,
+                    use_mmap: bool) -> ManifestReport:
+    """Writes the manifest for the (path, stat, known digest) entries, hashing the unknown digests in parallel
+
+    The hashing runs ahead of the writer by at most a few times the workers count, keeping the memory bounded.
+    The manifest is written to a temp file that replaces the target only when complete.
+    """
+
+    start_time = now()
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    max_pending = 4 * workers
+    files = hashed = size = 0
+    tmp_file = f"{manifest_file}.{os.getpid()}.tmp"
+
+    def write(out, rel_path, path_stat, digest):
+        out.write(_encode({"path": rel_path,
+                           "size": path_stat.st_size,
+                           "mtime_ns": path_stat.st_mtime_ns,
+                           "digest": digest}))
+        out.write("\n")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="manifest") as executor, \
+                open(tmp_file, "w", encoding="utf-8") as out:
+
+            out.write(_encode({"manifest": MANIFEST_VERSION, "root": root, "algorithm": algorithm}))
+            out.write("\n")
+
+            pending = deque()
+            for rel_path, path_stat, digest in entries:
+                files += 1
+                if digest is None:
+                    hashed += 1
+                    size += path_stat.st_size
+                    digest = executor.submit(hash_file, os.path.join(root, rel_path), algorithm, use_mmap)
+
+                pending.append((rel_path, path_stat, digest))
+
+                while pending and (len(pending) > max_pending or isinstance(pending[0][2], str)):
+                    rel_path, path_stat, digest = pending.popleft()
+                    write(out, rel_path, path_stat, digest if isinstance(digest, str) else digest.result())
+
+            while pending:
+                rel_path, path_stat, digest = pending.popleft()
+                write(out, rel_path, path_stat, digest if isinstance(digest, str) else digest.result())
+
+        os.replace(tmp_file, manifest_file)
+
+    finally:
+        if os.path.exists(tmp_file):
+            os.unlink(tmp_file)
+
+    return ManifestReport(manifest_file, files, hashed, size, now() - start_time)
+
+
+@log.call
+def build_manifest(path: Union[str, Path],
+                   manifest_file: Union[str, Path] = None,
+                   *,
+                   workers: int = None,
+                   algorithm: str = DEFAULT_ALGORITHM,
+                   use_mmap=False) -> ManifestReport:
+    """Hashes every file under path and persists the listing as JSON Lines
+
+    Args:
+        path(str|Path):             the root directory
+        manifest_file(str|Path):    the output file (defaults to '<path>.manifest.jsonl' next to the root dir)
+        workers(int):               the number of hashing threads
+        algorithm(str):             the hashlib algorithm name
+        use_mmap(bool):             hash memory mapped files instead of reading them in chunks
+
+    Returns:
+        obj(ManifestReport):        the manifest file, the files count, the hashed files count and bytes, the duration
+    """
+
+    root = os.path.abspath(str(path))
+    if not os.path.isdir(root):
+        raise NotADirectoryError(root)
+
+    manifest_file = os.path.abspath(str(manifest_file)) if manifest_file else _default_manifest_file(root)
+    return _write_manifest(root, manifest_file, _walk(root), workers=workers, algorithm=algorithm, use_mmap=use_mmap)
+
+
+@log.call
+def update_manifest(path: Union[str, Path],
+                    manifest_file: Union[str, Path] = None,
+                    *,
+                    workers: int = None,
+                    use_mmap=False) -> ManifestReport:
+    """Re-walks the tree and rewrites the manifest, re-hashing only the files whose size or mtime changed
+
+    Falls back to build_manifest if the manifest file is missing.
+    """
+
+    root = os.path.abspath(str(path))
+    manifest_file = os.path.abspath(str(manifest_file)) if manifest_file else _default_manifest_file(root)
+
+    if not os.path.exists(manifest_file):
+        return build_manifest(root, manifest_file, workers=workers, use_mmap=use_mmap)
+
+    algorithm = read_manifest_header(manifest_file).get("algorithm", DEFAULT_ALGORITHM)
+
+    def merged_entries():
+        old_entries = read_manifest(manifest_file)
+        old = next(old_entries, None)
+
+        for rel_path, path_stat, link_digest in _walk(root):
+            if link_digest is not None:
+                yield rel_path, path_stat, link_digest
+                continue
+
+            key = _sort_key(rel_path)
+            while old is not None and _sort_key(old.path) < key:
+                old = next(old_entries, None)
+
+            # an old symlink entry replaced by a file with the same path, size and mtime still has to be hashed
+            if (old is not None) and (old.path == rel_path) and not old.digest.startswith(SYMLINK_DIGEST_PREFIX) \
+                    and (old.size == path_stat.st_size) and (old.mtime_ns == path_stat.st_mtime_ns):
+                yield rel_path, path_stat, old.digest
+            else:
+                yield rel_path, path_stat, None
+
+    return _write_manifest(root, manifest_file, merged_entries(),
+                           workers=workers, algorithm=algorithm, use_mmap=use_mmap)
+
+
+def diff_manifests(old_file: Union[str, Path], new_file: Union[str, Path]) -> Iterator[ManifestChange]:
+    """Streams the 'added', 'removed' and 'modified' entries between two manifests of the same tree"""
+
+    old_entries, new_entries = read_manifest(old_file), read_manifest(new_file)
+    old, new = next(old_entries, None), next(new_entries, None)
+
+    while old is not None or new is not None:
+        if new is None or (old is not None and _sort_key(old.path) < _sort_key(new.path)):
+            yield ManifestChange(old.path, "removed", old, None)
+            old = next(old_entries, None)
+        elif old is None or _sort_key(new.path) < _sort_key(old.path):
+            yield ManifestChange(new.path, "added", None, new)
+            new = next(new_entries, None)
+        else:
+            if (old.size != new.size) or (old.digest != new.digest):
+                yield ManifestChange(new.path, "modified", old, new)
+            old, new = next(old_entries, None), next(new_entries, None)
+
+
+def find_duplicates(manifest_file: Union[str, Path], *, partitions=16) -> Iterator[List[ManifestEntry]]:
+    """Streams the groups of files with identical content (size and digest) - the symlinks are not included
+
+    The manifest is scanned once per partition and only the digests falling in the current
+    partition are held in memory, so the memory use is about 1/partitions of the manifest.
+    """
+
+    if partitions < 1:
+        raise ValueError(f"partitions must be positive! ({partitions})")
+
+    for partition in range(partitions):
+        groups = dict()
+        for entry in read_manifest(manifest_file):
+            if entry.digest.startswith(SYMLINK_DIGEST_PREFIX):
+                continue
+            if int(entry.digest[:8], 16) % partitions == partition:
+                groups.setdefault((entry.size, entry.digest), []).append(entry)
+
+        for group in groups.values():
+            if len(group) > 1:
+                yield group
@@ -1,11 +1,51 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-    Dummy conftest.py for hed_utils.
+    conftest.py for hed_utils - the fixtures shared by the test modules.
 
-    If you don't know what this is for, just leave it empty.
     Read more about conftest.py under:
     https://pytest.org/latest/plugins.html
 """
+import os
+import sys
 
-# import pytest
+import pytest
+
+# the process trees are spawned by the benchmark generators
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks"))
+
+import generators  # noqa: E402
+
+
+@pytest.fixture
+def spawn_process_tree(tmp_path):
+    """Returns a function spawning a tree of dummy shell/sleep processes, returning its root Popen once it's ready
+
+    See generators.spawn_process_tree - the trees are smaller by default. The leftovers are killed on teardown.
+    """
+
+    if sys.platform.startswith("win"):
+        pytest.skip("the process trees are spawned with sh")
+
+    psutil = pytest.importorskip("psutil")
+    roots = []
+
+    def spawn(*, depth=2, width=3, ignore_sigterm=False, timeout=30):
+        root = generators.spawn_process_tree(str(tmp_path), depth=depth, width=width, ignore_sigterm=ignore_sigterm,
+                                             timeout=timeout)
+        roots.append(root)
+        return root
+
+    yield spawn
+
+    for root in roots:
+        try:
+            processes = psutil.Process(root.pid).children(recursive=True) + [psutil.Process(root.pid)]
+        except psutil.NoSuchProcess:
+            processes = []
+        for process in processes:
+            try:
+                process.kill()
+            except psutil.NoSuchProcess:
+                pass
+        root.wait()
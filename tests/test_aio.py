@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+import threading
+from timeit import default_timer as now
+
+import pytest
+
+from hed_utils.support.persistence import aio, json_file, manifest
+
+TICK_INTERVAL = 0.001
+
+# the largest stall seen is unpickling a decoded file in the loop process (~0.05s here) - leaves room for loaded CI
+MAX_LAG = 0.25
+
+
+def _payload(records: int) -> dict:
+    return {"name": "payload",
+            "records": [{"id": index, "label": f"record {index}", "tags": ["a", "b", "c"], "nested": {"x": [1.5, None]}}
+                        for index in range(records)]}
+
+
+@pytest.fixture
+def pool():
+    aio.configure(max_workers=4, max_open_files=8)
+    yield
+    aio.shutdown()
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_read_write_json_round_trip(use_processes, tmp_path):
+    file = tmp_path.joinpath("doc.json")
+    payload = _payload(100)
+    aio.configure(process_workers=1)
+
+    async def round_trip():
+        await aio.write_json(payload, file)
+        return await aio.read_json(file, use_processes=use_processes)
+
+    try:
+        assert asyncio.run(round_trip()) == payload
+    finally:
+        aio.shutdown()
+    assert json_file.read_json(file) == payload
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="the read is held back by a FIFO")
+def test_read_json_skips_the_decoding_when_cancelled(pool, tmp_path, monkeypatch):
+    fifo = tmp_path.joinpath("doc.json")
+    os.mkfifo(fifo)
+    decoded = threading.Event()
+    loads = json_file.loads
+    monkeypatch.setattr(json_file, "loads", lambda text: decoded.set() or loads(text))
+
+    async def cancel_read():
+        # the worker blocks opening the FIFO until it has a writer
+        task = asyncio.ensure_future(aio.read_json(fifo))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_read())
+    with open(fifo, "w") as out_file:
+        out_file.write("[1, 2, 3]")
+    aio.shutdown()
+
+    assert not decoded.is_set()
+
+
+def test_iter_manifest_streams_all_entries(pool, tmp_path):
+    root = tmp_path.joinpath("tree")
+    root.mkdir()
+    for index in range(25):
+        root.joinpath(f"{index:02d}.txt").write_text(str(index))
+    report = manifest.build_manifest(root, tmp_path.joinpath("tree.jsonl"))
+
+    async def collect():
+        return [entry async for entry in aio.iter_manifest(report.file, batch_size=10)]
+
+    assert asyncio.run(collect()) == list(manifest.read_manifest(report.file))
+
+
+def test_concurrent_read_json_keeps_the_loop_responsive(tmp_path):
+    files = [tmp_path.joinpath(f"doc_{index}.json") for index in range(4)]
+    for file in files:
+        json_file.write_json(_payload(5000), file)
+
+    async def measure():
+        # the process pool start up is not the loop lag being measured
+        await aio.read_json(files[0])
+
+        lags = []
+        done = asyncio.Event()
+
+        async def ticker():
+            while not done.is_set():
+                expected = now() + TICK_INTERVAL
+                await asyncio.sleep(TICK_INTERVAL)
+                lags.append(max(0.0, now() - expected))
+
+        ticker_task = asyncio.ensure_future(ticker())
+        loaded = await asyncio.gather(*[aio.read_json(file) for file in files])
+        done.set()
+        await ticker_task
+        return loaded, sorted(lags)
+
+    aio.configure(max_workers=4, max_open_files=8, process_workers=1)
+    try:
+        loaded, lags = asyncio.run(measure())
+    finally:
+        aio.shutdown()
+
+    assert all(len(doc["records"]) == 5000 for doc in loaded)
+    assert lags[-1] < MAX_LAG
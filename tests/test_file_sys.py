@@ -0,0 +1,295 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from hed_utils.support.persistence import file_sys
+
+
+def _make_tree(root, files):
+    for rel_path, text in files.items():
+        path = root.joinpath(rel_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def _read_tree(root):
+    return {str(path.relative_to(root)): path.read_text() for path in sorted(root.rglob("*")) if path.is_file()}
+
+
+def _run_with_timeout(func, *args, timeout=30):
+    result = []
+    worker = threading.Thread(target=lambda: result.append(func(*args)), daemon=True)
+    worker.start()
+    worker.join(timeout=timeout)
+    assert not worker.is_alive(), f"{func.__name__} blocked"
+    return result[0]
+
+
+def test_sync_tree_copies_missing_tree(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a", "sub/b.txt": "bb", "sub/deep/c.txt": "ccc"})
+
+    report = file_sys.sync_tree(src, dst)
+
+    assert _read_tree(dst) == _read_tree(src)
+    assert (report.copied, report.skipped, report.deleted, report.bytes) == (3, 0, 0, 6)
+
+
+def test_sync_tree_copies_only_changed_files(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a", "sub/b.txt": "bb"})
+    file_sys.sync_tree(src, dst)
+
+    src.joinpath("sub", "b.txt").write_text("changed")
+    os.utime(src.joinpath("sub", "b.txt"), ns=(1, 1))
+    report = file_sys.sync_tree(src, dst)
+
+    assert _read_tree(dst) == _read_tree(src)
+    assert (report.copied, report.skipped) == (1, 1)
+
+
+def test_sync_tree_deletes_stale_entries(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a"})
+    _make_tree(dst, {"a.txt": "a", "stale.txt": "x", "stale_dir/x.txt": "x"})
+
+    report = file_sys.sync_tree(src, dst)
+
+    assert _read_tree(dst) == {"a.txt": "a"}
+    assert not dst.joinpath("stale_dir").exists()
+    assert report.deleted == 2
+
+
+def test_sync_tree_keeps_stale_entries(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a"})
+    _make_tree(dst, {"stale.txt": "x"})
+
+    file_sys.sync_tree(src, dst, delete_stale=False)
+
+    assert _read_tree(dst) == {"a.txt": "a", "stale.txt": "x"}
+
+
+def test_sync_tree_checksum_detects_same_size_changes(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "aaa"})
+    file_sys.sync_tree(src, dst)
+
+    dst.joinpath("a.txt").write_text("bbb")
+    os.utime(dst.joinpath("a.txt"), ns=(os.stat(src.joinpath("a.txt")).st_atime_ns,
+                                        os.stat(src.joinpath("a.txt")).st_mtime_ns))
+
+    assert file_sys.sync_tree(src, dst).copied == 0
+    assert file_sys.sync_tree(src, dst, checksum=True).copied == 1
+    assert _read_tree(dst) == {"a.txt": "aaa"}
+
+
+def test_sync_tree_replaces_files_without_touching_other_hardlinks(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "new"})
+    _make_tree(dst, {"a.txt": "old"})
+    link = tmp_path.joinpath("link.txt")
+    os.link(dst.joinpath("a.txt"), link)
+
+    file_sys.sync_tree(src, dst)
+
+    assert dst.joinpath("a.txt").read_text() == "new"
+    assert link.read_text() == "old"
+    assert sorted(os.listdir(dst)) == ["a.txt"]
+
+
+def test_sync_tree_copies_directory_mode_and_mtime(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"sub/a.txt": "a"})
+    os.chmod(src.joinpath("sub"), 0o750)
+    os.utime(src.joinpath("sub"), ns=(1000000000, 1000000000))
+
+    file_sys.sync_tree(src, dst)
+
+    dst_stat, src_stat = os.stat(dst.joinpath("sub")), os.stat(src.joinpath("sub"))
+    assert stat.S_IMODE(dst_stat.st_mode) == 0o750
+    assert dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+def test_delete_reports_removed_entries(tmp_path):
+    root = tmp_path.joinpath("root")
+    _make_tree(root, {"a.txt": "a", "sub/b.txt": "bb"})
+
+    report = file_sys.delete(root)
+
+    assert not root.exists()
+    assert (report.files, report.dirs, report.bytes) == (2, 2, 3)
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+@pytest.mark.parametrize("dir_fd_supported", [True, False])
+def test_delete_routes_report_the_same_counts_and_unlink_symlinks(workers, dir_fd_supported, tmp_path, monkeypatch):
+    if dir_fd_supported and not file_sys._DIR_FD_SUPPORTED:
+        pytest.skip("the platform has no dir_fd support")
+    monkeypatch.setattr(file_sys, "_DIR_FD_SUPPORTED", dir_fd_supported)
+    root, outside = tmp_path.joinpath("root"), tmp_path.joinpath("outside")
+    _make_tree(root, {"a.txt": "a", "sub/b.txt": "bb", "sub/deep/c.txt": "ccc", "other/d.txt": "dddd"})
+    _make_tree(outside, {"keep.txt": "keep"})
+    os.symlink(str(outside), root.joinpath("outside_link"))
+    os.symlink(str(outside), root.joinpath("sub", "deep", "outside_link"))
+    link_bytes = 2 * len(str(outside))
+
+    report = file_sys.delete(root, workers=workers)
+
+    assert not os.path.lexists(root)
+    assert _read_tree(outside) == {"keep.txt": "keep"}
+    assert (report.files, report.dirs, report.bytes) == (6, 4, 10 + link_bytes)
+
+
+def test_delete_unlinks_a_symlink_to_a_directory(tmp_path):
+    target = tmp_path.joinpath("target")
+    _make_tree(target, {"a.txt": "a"})
+    link = tmp_path.joinpath("link")
+    os.symlink(str(target), link)
+
+    report = file_sys.delete(link)
+
+    assert not os.path.lexists(link)
+    assert _read_tree(target) == {"a.txt": "a"}
+    assert (report.files, report.dirs, report.bytes) == (1, 0, len(str(target)))
+
+
+def test_tmp_workspace_cleans_up_over_size_budget(tmp_path):
+    src = tmp_path.joinpath("src.txt")
+    src.write_text("x" * 100)
+    workspace = file_sys.TmpWorkspace(tmp_path.joinpath("workspace"), max_bytes=250)
+
+    paths = [workspace.snapshot(src) for _ in range(3)]
+
+    assert [item.path for item in workspace.snapshots] == paths[1:]
+    assert not os.path.exists(paths[0])
+    assert all(os.path.exists(path) for path in paths[1:])
+
+
+def test_tmp_workspace_scan_adopts_leftovers(tmp_path):
+    root = tmp_path.joinpath("workspace")
+    _make_tree(root, {"old.txt": "old", "old_dir/a.txt": "aa", "new.txt": "new"})
+    os.utime(root.joinpath("old.txt"), (1, 1))
+    os.utime(root.joinpath("old_dir"), (1, 1))
+
+    workspace = file_sys.TmpWorkspace(root, max_age=60)
+    found = workspace.scan()
+
+    assert sorted(os.path.basename(item.path) for item in found) == ["new.txt", "old.txt", "old_dir"]
+    assert sorted(os.listdir(root)) == ["new.txt"]
+    assert [os.path.basename(item.path) for item in workspace.snapshots] == ["new.txt"]
+
+
+def test_sync_tree_copies_symlinks_as_symlinks(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"sub/a.txt": "a"})
+    os.symlink("sub", src.joinpath("dir_link"))
+    os.symlink("missing.txt", src.joinpath("dangling"))
+    os.symlink("..", src.joinpath("sub", "cycle"))
+
+    report = file_sys.sync_tree(src, dst)
+
+    assert _read_tree(dst) == {"sub/a.txt": "a"}
+    assert dst.joinpath("dir_link", "a.txt").read_text() == "a"
+    assert [os.readlink(dst.joinpath(name)) for name in ("dir_link", "dangling", "sub/cycle")] == \
+           ["sub", "missing.txt", ".."]
+    assert (report.copied, report.skipped) == (4, 0)
+
+    src.joinpath("dangling").unlink()
+    os.symlink("other.txt", src.joinpath("dangling"))
+    report = file_sys.sync_tree(src, dst)
+
+    assert os.readlink(dst.joinpath("dangling")) == "other.txt"
+    assert (report.copied, report.skipped, report.deleted) == (1, 3, 1)
+
+
+def test_sync_tree_replaces_files_with_symlinks_and_back(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a"})
+    os.symlink("a.txt", src.joinpath("b.txt"))
+    _make_tree(dst, {"a.txt": "a", "b.txt": "file", "c/x.txt": "x"})
+    os.symlink("a.txt", dst.joinpath("c_link"))
+    os.symlink("a.txt", src.joinpath("c"))
+
+    file_sys.sync_tree(src, dst)
+
+    assert os.readlink(dst.joinpath("b.txt")) == "a.txt"
+    assert os.readlink(dst.joinpath("c")) == "a.txt"
+    assert not dst.joinpath("c_link").exists()
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="FIFOs are not supported")
+def test_sync_tree_skips_special_files(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a"})
+    os.mkfifo(src.joinpath("fifo"))
+    _make_tree(dst, {"fifo": "stale"})
+
+    report = _run_with_timeout(file_sys.sync_tree, src, dst)
+
+    assert sorted(os.listdir(dst)) == ["a.txt"]
+    assert (report.copied, report.deleted) == (1, 1)
+    with pytest.raises(ValueError):
+        file_sys.sync_tree(src.joinpath("fifo"), dst.joinpath("fifo"))
+
+
+def test_snapshot_copies_symlinks_as_symlinks(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"sub/a.txt": "a"})
+    os.symlink("sub", src.joinpath("dir_link"))
+    os.symlink("missing.txt", src.joinpath("dangling"))
+    os.symlink("..", src.joinpath("sub", "cycle"))
+
+    result = file_sys.snapshot(src, dst)
+
+    assert _read_tree(dst) == {"sub/a.txt": "a"}
+    assert [os.readlink(dst.joinpath(name)) for name in ("dir_link", "dangling", "sub/cycle")] == \
+           ["sub", "missing.txt", ".."]
+    assert result.bytes <= 1
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="FIFOs are not supported")
+def test_snapshot_skips_special_files(tmp_path):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a"})
+    os.mkfifo(src.joinpath("fifo"))
+
+    _run_with_timeout(file_sys.snapshot, src, dst)
+
+    assert sorted(os.listdir(dst)) == ["a.txt"]
+    with pytest.raises(ValueError):
+        file_sys.snapshot(src.joinpath("fifo"), tmp_path.joinpath("fifo"))
+
+
+def test_snapshot_removes_the_partial_copy_on_failure(tmp_path, monkeypatch):
+    src, dst = tmp_path.joinpath("src"), tmp_path.joinpath("dst")
+    _make_tree(src, {"a.txt": "a", "sub/b.txt": "b"})
+    snapshot_file = file_sys._snapshot_file
+
+    def fail_on_b(src_file, *args):
+        if src_file.endswith("b.txt"):
+            raise OSError("disk full")
+        return snapshot_file(src_file, *args)
+
+    monkeypatch.setattr(file_sys, "_snapshot_file", fail_on_b)
+
+    with pytest.raises(OSError):
+        file_sys.snapshot(src, dst)
+
+    assert not os.path.lexists(dst)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid") or os.getuid() != 0, reason="changing the owner needs root")
+def test_tmp_workspace_scan_skips_entries_of_other_users(tmp_path):
+    root = tmp_path.joinpath("workspace")
+    _make_tree(root, {"mine.txt": "mine", "theirs.txt": "theirs"})
+    os.chown(root.joinpath("theirs.txt"), 12345, -1)
+    os.utime(root.joinpath("theirs.txt"), (1, 1))
+
+    workspace = file_sys.TmpWorkspace(root, max_age=60)
+    found = workspace.scan()
+
+    assert [os.path.basename(item.path) for item in found] == ["mine.txt"]
+    assert sorted(os.listdir(root)) == ["mine.txt", "theirs.txt"]
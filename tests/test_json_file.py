@@ -0,0 +1,41 @@
+import json
+import threading
+
+import pytest
+
+from hed_utils.support.persistence import json_file
+
+DOCUMENT = {"name": "doc", "records": [{"id": index, "tags": ["a", "b"], "nested": {"x": [1.5, None]}}
+                                       for index in range(10)], "ünïcode": "☃ \"quoted\" \\ \n"}
+
+
+def test_write_read_json_round_trip(tmp_path):
+    file = tmp_path.joinpath("doc.json")
+
+    json_file.write_json(DOCUMENT, file, cancelled=threading.Event())
+
+    assert file.read_text(encoding="utf-8") == json.dumps(DOCUMENT)
+    assert json_file.read_json(file) == DOCUMENT
+    assert json_file.read_json(file, cancelled=threading.Event()) == DOCUMENT
+
+
+def test_read_json_raises_cancelled_instead_of_decoding(tmp_path, monkeypatch):
+    file = tmp_path.joinpath("doc.json")
+    json_file.write_json(DOCUMENT, file)
+    monkeypatch.setattr(json_file, "loads", lambda text: pytest.fail("decoded after the cancellation"))
+    cancelled = threading.Event()
+    cancelled.set()
+
+    with pytest.raises(json_file.Cancelled):
+        json_file.read_json(file, cancelled=cancelled)
+
+
+def test_write_json_raises_cancelled_before_touching_the_file(tmp_path):
+    file = tmp_path.joinpath("doc.json")
+    cancelled = threading.Event()
+    cancelled.set()
+
+    with pytest.raises(json_file.Cancelled):
+        json_file.write_json(DOCUMENT, file, cancelled=cancelled)
+
+    assert not file.exists()
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import time
+
+import pytest
+
+from hed_utils.support import log
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def records():
+    logger = logging.getLogger("test_log")
+    old_level, old_propagate = logger.level, logger.propagate
+    handler = _Records()
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+    yield handler.records
+    logger.removeHandler(handler)
+    logger.setLevel(old_level)
+    logger.propagate = old_propagate
+
+
+@pytest.fixture
+def structured(monkeypatch):
+    monkeypatch.setattr(log, "_structured", True)
+
+
+def _add(a, b=2):
+    return [a, b]
+
+
+def _fail():
+    raise KeyError("missing")
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+
+
+def _allocate(size: int) -> bytearray:
+    return bytearray(size)
+
+
+def _allocate_and_free(size: int) -> int:
+    return len(bytearray(size))
+
+
+def _make_record(**kwargs) -> logging.LogRecord:
+    record = logging.makeLogRecord(dict(name="test_log", levelno=logging.INFO, levelname="INFO",
+                                        msg="value: %s", args=(42,), created=1000000000.5, msecs=500.0))
+    record.__dict__.update(kwargs)
+    return record
+
+
+def test_json_formatter_writes_single_line_objects_with_extra_fields():
+    line = log.JsonFormatter().format(_make_record(span_id=7, payload={"a": [1, 2]}, path=object()))
+
+    fields = json.loads(line)
+    assert "\n" not in line
+    assert fields["time"] == "2001-09-09T01:46:40.500Z"
+    assert (fields["level"], fields["logger"], fields["message"]) == ("INFO", "test_log", "value: 42")
+    assert (fields["span_id"], fields["payload"]) == (7, {"a": [1, 2]})
+    assert fields["path"].startswith("<object object")
+    assert not {"msg", "args", "levelno", "created"} & set(fields)
+
+
+def test_json_formatter_includes_the_exception():
+    try:
+        _fail()
+    except KeyError:
+        record = _make_record(exc_info=sys.exc_info())
+
+    fields = json.loads(log.JsonFormatter().format(record))
+
+    assert fields["exception"].startswith("Traceback")
+    assert "KeyError: 'missing'" in fields["exception"]
+
+
+def test_json_formatter_reuses_the_formatted_second():
+    formatter = log.JsonFormatter()
+
+    times = [json.loads(formatter.format(_make_record(created=created, msecs=msecs)))["time"]
+             for created, msecs in [(1000000000.1, 100.0), (1000000000.9, 900.0), (1000000001.0, 0.0)]]
+
+    assert times == ["2001-09-09T01:46:40.100Z", "2001-09-09T01:46:40.900Z", "2001-09-09T01:46:41.000Z"]
+
+
+def test_call_logs_the_details_in_the_text_messages(records):
+    assert log.call(_add, name="test_log")(1, b=3) == [1, 3]
+
+    enter, leave = records
+    assert enter.getMessage() == f"---> {__name__}._add(a=<int, 1>, b=<int, 3>)"
+    assert re.fullmatch(rf"{__name__}\._add <--- <list, \[1, 3\]> \d+\.\d{{6}} ms\.", leave.getMessage())
+    assert (enter.function, enter.depth, enter.parent_id) == (f"{__name__}._add", 0, None)
+    assert (leave.span_id, leave.result_type, leave.result_len) == (enter.span_id, "list", 2)
+    assert leave.duration_ms >= 0
+
+
+def test_call_keeps_the_structured_messages_short(records, structured):
+    log.call(_add, name="test_log", profile_memory=True)(1)
+
+    enter, leave = records
+    assert enter.getMessage() == f"---> {__name__}._add"
+    assert enter.call == f"{__name__}._add(a=<int, 1>, b=<int, 2>)"
+    assert leave.getMessage() == f"{__name__}._add <---"
+    assert (leave.result, leave.result_type, leave.result_len) == ("[1, 2]", "list", 2)
+    assert leave.duration_ms >= 0 and leave.memory_peak >= 0
+
+    fields = json.loads(log.JsonFormatter().format(leave))
+    assert fields["message"] == f"{__name__}._add <---"
+    assert fields["result"] == "[1, 2]"
+
+
+def test_call_structured_skips_the_result_without_log_result(records, structured):
+    log.call(_add, name="test_log", log_result=False)(1)
+
+    assert not hasattr(records[-1], "result")
+    assert records[-1].result_len == 2
+
+
+def test_call_structured_exception(records, structured):
+    with pytest.raises(KeyError):
+        log.call(_fail, name="test_log")()
+
+    leave = records[-1]
+    assert leave.getMessage() == f"{__name__}._fail <--- Exception"
+    assert leave.exception_type == "KeyError"
+    assert leave.exc_info[0] is KeyError
+
+
+def test_call_nested_spans(records):
+    inner = log.call(_add, name="test_log")
+    outer = log.call(lambda: inner(1), name="test_log")
+
+    outer()
+
+    outer_enter, inner_enter, inner_leave, outer_leave = records
+    assert inner_enter.parent_id == outer_enter.span_id
+    assert (outer_enter.depth, inner_enter.depth) == (0, 1)
+    assert inner_leave.span_id == inner_enter.span_id
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(log, "_profiling", dict(log._profiling))
+    monkeypatch.setattr(log, "_structured", False)
+    # init adds its handler to the root logger - keep it out of the other tests
+    monkeypatch.setattr(logging.root, "handlers", list(logging.root.handlers))
+
+
+def test_call_writes_cpu_profiles_only_above_the_threshold(records, tmp_path):
+    fast = log.call(_sleep, name="test_log", profile_cpu=True, profile_cpu_threshold=60, profile_dir=tmp_path)
+    slow = log.call(_sleep, name="test_log", profile_cpu=True, profile_cpu_threshold=0.01, profile_dir=tmp_path)
+
+    fast(0)
+    assert os.listdir(tmp_path) == []
+    assert not hasattr(records[-1], "cpu_profile")
+
+    slow(0.02)
+    profile_file = records[-1].cpu_profile
+    assert os.listdir(tmp_path) == [os.path.basename(profile_file)]
+    assert profile_file.endswith(".prof") and f"cpu profile: <{profile_file}>" in records[-1].getMessage()
+    assert any(function == "_sleep" for _, _, function in pstats.Stats(profile_file).stats)
+
+
+def test_call_measures_the_memory_of_a_known_allocation(records):
+    size = 10 * 1024 * 1024
+
+    log.call(_allocate, name="test_log", profile_memory=True)(size)
+    kept = records[-1]
+    log.call(_allocate_and_free, name="test_log", profile_memory=True)(size)
+    freed = records[-1]
+
+    assert size <= kept.memory_net < size + 1024 * 1024
+    assert size <= kept.memory_peak < size + 1024 * 1024
+    assert freed.memory_net < 1024 * 1024
+    assert size <= freed.memory_peak < size + 1024 * 1024
+
+
+def test_call_uses_the_init_profiling_defaults(records, profiling, tmp_path):
+    traced = log.call(_allocate, name="test_log")
+    log.init(fmt="%(message)s", utc_prefix=False, profile_memory=True, profile_cpu=True, profile_cpu_threshold=0,
+             profile_dir=tmp_path)
+
+    traced(1024)
+
+    assert records[-1].memory_peak >= 1024
+    assert os.listdir(tmp_path) == [os.path.basename(records[-1].cpu_profile)]
+
+    log.call(_allocate, name="test_log", profile_memory=False, profile_cpu=False)(1024)
+
+    assert not hasattr(records[-1], "memory_peak") and not hasattr(records[-1], "cpu_profile")
@@ -0,0 +1,113 @@
+import gzip
+import logging
+import os
+from timeit import default_timer as now
+
+import pytest
+
+from hed_utils.support.log_rotation import CompressingRotatingFileHandler
+
+MAX_WRITE_LATENCY = 0.1
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("test_log_rotation")
+    old_level, old_propagate = logger.level, logger.propagate
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    yield logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(old_level)
+    logger.propagate = old_propagate
+
+
+def _add_handler(logger, file, **kwargs) -> CompressingRotatingFileHandler:
+    handler = CompressingRotatingFileHandler(file, **kwargs)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    return handler
+
+
+def _read_lines(path: str) -> list:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as in_file:
+        return in_file.read().splitlines()
+
+
+def _read_all(handler: CompressingRotatingFileHandler) -> list:
+    lines = []
+    for segment in handler.segments() + [handler.baseFilename]:
+        lines.extend(_read_lines(segment))
+    return lines
+
+
+def test_rotation_keeps_every_record_in_order_with_bounded_latency(logger, tmp_path):
+    handler = _add_handler(logger, tmp_path.joinpath("app.log"), max_bytes=32 * 1024)
+    records = 20000
+
+    max_latency = 0
+    for index in range(records):
+        start_time = now()
+        logger.info("%d %s", index, "x" * 100)
+        max_latency = max(max_latency, now() - start_time)
+
+    logger.removeHandler(handler)
+    handler.close()
+
+    segments = handler.segments()
+    assert len(segments) > 50
+    assert all(segment.endswith(".gz") for segment in segments)
+    assert [int(line.split(" ", 1)[0]) for line in _read_all(handler)] == list(range(records))
+    assert max_latency < MAX_WRITE_LATENCY
+
+
+def test_rotation_prunes_beyond_backup_count(logger, tmp_path):
+    handler = _add_handler(logger, tmp_path.joinpath("app.log"), max_bytes=1024, backup_count=3)
+
+    for index in range(1000):
+        logger.info("%d %s", index, "x" * 100)
+
+    logger.removeHandler(handler)
+    handler.close()
+
+    segments = handler.segments()
+    assert len(segments) == 3
+    lines = [int(line.split(" ", 1)[0]) for line in _read_all(handler)]
+    assert lines == list(range(lines[0], 1000))
+
+
+def test_rotation_without_compression(logger, tmp_path):
+    handler = _add_handler(logger, tmp_path.joinpath("app.log"), max_bytes=1024, compress=False)
+
+    for index in range(100):
+        logger.info("%d %s", index, "x" * 100)
+
+    logger.removeHandler(handler)
+    handler.close()
+
+    assert not any(segment.endswith(".gz") for segment in handler.segments())
+    assert [int(line.split(" ", 1)[0]) for line in _read_all(handler)] == list(range(100))
+
+
+def test_recovers_segments_left_by_a_crash(tmp_path):
+    file = tmp_path.joinpath("app.log")
+    segment = f"{file}.20200101-000000-000000"
+    with open(segment, "w", encoding="utf-8") as out_file:
+        out_file.write("left behind\n")
+    with open(f"{file}.20200101-000001-000000.gz.tmp", "wb") as out_file:
+        out_file.write(b"partial")
+
+    handler = CompressingRotatingFileHandler(file)
+    handler.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["app.log", "app.log.20200101-000000-000000.gz"]
+    assert handler.segments() == [f"{segment}.gz"]
+    assert _read_lines(f"{segment}.gz") == ["left behind"]
+
+
+def test_rejects_negative_options(tmp_path):
+    with pytest.raises(ValueError):
+        CompressingRotatingFileHandler(tmp_path.joinpath("app.log"), max_bytes=-1)
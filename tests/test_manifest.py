@@ -0,0 +1,100 @@
+import os
+import threading
+
+import pytest
+
+from hed_utils.support.persistence import manifest
+
+
+def _make_tree(root, files):
+    for rel_path, text in files.items():
+        path = root.joinpath(rel_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def _entries(manifest_file):
+    return {entry.path: entry for entry in manifest.read_manifest(manifest_file)}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path.joinpath("tree")
+    _make_tree(root, {"a.txt": "a", "b/c.txt": "same", "b/d.txt": "same", "b/e/f.txt": "f"})
+    return root
+
+
+def test_build_manifest_lists_files_in_walk_order(tree, tmp_path):
+    report = manifest.build_manifest(tree, tmp_path.joinpath("tree.jsonl"))
+
+    assert [entry.path for entry in manifest.read_manifest(report.file)] == \
+        ["a.txt", "b/c.txt", "b/d.txt", "b/e/f.txt"]
+    assert (report.files, report.hashed, report.bytes) == (4, 4, 10)
+    assert _entries(report.file)["a.txt"].digest == manifest.hash_file(tree.joinpath("a.txt"))
+
+
+def test_build_manifest_records_symlink_to_directory(tree, tmp_path):
+    os.symlink(tree.joinpath("b"), tree.joinpath("link_dir"))
+
+    report = manifest.build_manifest(tree, tmp_path.joinpath("tree.jsonl"))
+
+    entry = _entries(report.file)["link_dir"]
+    assert entry.digest == f"{manifest.SYMLINK_DIGEST_PREFIX}{tree.joinpath('b')}"
+    assert report.hashed == 4
+
+
+def test_build_manifest_records_dangling_symlink(tree, tmp_path):
+    os.symlink(tmp_path.joinpath("missing"), tree.joinpath("dangling"))
+
+    report = manifest.build_manifest(tree, tmp_path.joinpath("tree.jsonl"))
+
+    assert _entries(report.file)["dangling"].digest == f"{manifest.SYMLINK_DIGEST_PREFIX}{tmp_path.joinpath('missing')}"
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="FIFOs are not supported")
+def test_build_manifest_skips_fifo(tree, tmp_path):
+    os.mkfifo(tree.joinpath("fifo"))
+    result = []
+
+    worker = threading.Thread(target=lambda: result.append(manifest.build_manifest(tree, tmp_path.joinpath("m"))),
+                              daemon=True)
+    worker.start()
+    worker.join(timeout=30)
+
+    assert not worker.is_alive(), "build_manifest blocked on the FIFO"
+    assert "fifo" not in _entries(result[0].file)
+
+
+def test_update_manifest_rehashes_only_changed_files(tree, tmp_path):
+    manifest_file = tmp_path.joinpath("tree.jsonl")
+    manifest.build_manifest(tree, manifest_file)
+    tree.joinpath("a.txt").write_text("changed")
+    os.symlink("a.txt", tree.joinpath("link"))
+
+    report = manifest.update_manifest(tree, manifest_file)
+
+    assert (report.files, report.hashed) == (5, 1)
+    assert _entries(manifest_file)["a.txt"].digest == manifest.hash_file(tree.joinpath("a.txt"))
+
+
+def test_diff_manifests_streams_changes(tree, tmp_path):
+    old_file, new_file = tmp_path.joinpath("old.jsonl"), tmp_path.joinpath("new.jsonl")
+    manifest.build_manifest(tree, old_file)
+
+    tree.joinpath("a.txt").write_text("changed")
+    tree.joinpath("b", "d.txt").unlink()
+    _make_tree(tree, {"b/e/g.txt": "g"})
+    manifest.build_manifest(tree, new_file)
+
+    changes = [(change.path, change.change) for change in manifest.diff_manifests(old_file, new_file)]
+
+    assert changes == [("a.txt", "modified"), ("b/d.txt", "removed"), ("b/e/g.txt", "added")]
+
+
+def test_find_duplicates_groups_same_content(tree, tmp_path):
+    os.symlink("c.txt", tree.joinpath("b", "link"))
+    report = manifest.build_manifest(tree, tmp_path.joinpath("tree.jsonl"))
+
+    groups = [[entry.path for entry in group] for group in manifest.find_duplicates(report.file, partitions=3)]
+
+    assert groups == [["b/c.txt", "b/d.txt"]]
@@ -0,0 +1,331 @@
+import os
+import stat
+import tempfile
+import time
+from collections import Counter
+from timeit import default_timer as now
+
+import pytest
+
+from hed_utils.support import os_util
+
+psutil = pytest.importorskip("psutil")
+
+
+def test_kill_process_by_pid_escalates_sigterm_ignoring_tree(spawn_process_tree):
+    timeout = 1
+    root = spawn_process_tree(depth=2, width=3, ignore_sigterm=True)
+
+    start_time = now()
+    victims = os_util.kill_process_by_pid(root.pid, dry=False, timeout=timeout)
+    duration = now() - start_time
+    root.wait()
+
+    assert len(victims) == 13
+    # a shell can exit on its own between the kill of its last child and its own
+    assert Counter(victim.status for victim in victims if victim.name == "sleep") == {"KILLED": 9}
+    assert {victim.status for victim in victims} <= {"KILLED", "GONE"}
+    # one shared timeout for all the victims - not one per victim
+    assert duration < timeout + 2
+
+
+def test_kill_process_by_pid_terminates_tree(spawn_process_tree):
+    root = spawn_process_tree(depth=1, width=3)
+
+    victims = os_util.kill_process_by_pid(root.pid, dry=False, timeout=5)
+    root.wait()
+
+    assert len(victims) == 4
+    assert root.pid in {victim.pid for victim in victims}
+    assert {victim.status for victim in victims} <= {"TERMINATED", "GONE"}
+    assert not any(psutil.pid_exists(victim.pid) and psutil.Process(victim.pid).status() != psutil.STATUS_ZOMBIE
+                   for victim in victims)
+
+
+def test_kill_process_by_pid_dry_run_keeps_tree(spawn_process_tree):
+    root = spawn_process_tree(depth=1, width=2)
+
+    victims = os_util.kill_process_by_pid(root.pid, dry=True)
+
+    assert len(victims) == 3
+    assert root.poll() is None
+
+
+def _info(name="proc", **kwargs):
+    info = dict(pid=100, ppid=1, name=name, cmdline=[name], exe=f"/usr/bin/{name}", username="user", create_time=0.0)
+    info.update(kwargs)
+    return info
+
+
+def test_process_matcher_names_match_exactly():
+    matcher = os_util.ProcessMatcher(names=["a.b", "sleep"])
+
+    assert matcher.matches(_info("a.b"))
+    assert matcher.matches(_info("sleep"))
+    assert not matcher.matches(_info("axb"))
+    assert not matcher.matches(_info("sleep2"))
+    assert not matcher.matches(_info(None))
+
+
+def test_process_matcher_patterns_and_names_are_alternatives():
+    matcher = os_util.ProcessMatcher(names=["bash"], patterns=["^chrom", "fox$"], ignorecase=True)
+
+    assert matcher.matches(_info("BASH"))
+    assert matcher.matches(_info("Chromium"))
+    assert matcher.matches(_info("firefox"))
+    assert not matcher.matches(_info("python"))
+
+
+def test_process_matcher_pattern_inline_global_flags():
+    matcher = os_util.ProcessMatcher(patterns=["(?i)chrome", "python"])
+
+    assert matcher.matches(_info("Google CHROME"))
+    assert matcher.matches(_info("python3"))
+
+
+def test_process_matcher_patterns_with_same_group_names():
+    matcher = os_util.ProcessMatcher(patterns=["(?P<x>a)x", "(?P<x>b)y"])
+
+    assert matcher.matches(_info("by"))
+    assert not matcher.matches(_info("bx"))
+
+
+def test_process_matcher_pattern_backreferences():
+    matcher = os_util.ProcessMatcher(patterns=[r"(a)\1", r"(b)\1"])
+
+    assert matcher.matches(_info("bb"))
+    assert matcher.matches(_info("aa"))
+    assert not matcher.matches(_info("ab"))
+
+
+def test_process_matcher_criteria_narrow_the_selection():
+    matcher = os_util.ProcessMatcher(patterns=["sleep"], cmdline="600", exe="bin/sleep$", username="user", ppid=7)
+
+    assert matcher.matches(_info("sleep", cmdline=["sleep", "600"], ppid=7))
+    assert not matcher.matches(_info("sleep", cmdline=["sleep", "5"], ppid=7))
+    assert not matcher.matches(_info("sleep", cmdline=["sleep", "600"], ppid=8))
+    assert not matcher.matches(_info("sleep", cmdline=["sleep", "600"], ppid=7, username="root"))
+    assert not matcher.matches(_info("sleep", cmdline=None, ppid=7))
+    assert sorted(matcher.attrs) == ["cmdline", "exe", "name", "ppid", "username"]
+
+
+def test_process_matcher_min_age():
+    matcher = os_util.ProcessMatcher(names=["sleep"], min_age=60)
+
+    assert matcher.matches(_info("sleep", create_time=0.0))
+    assert not matcher.matches(_info("sleep", create_time=time.time()))
+    assert matcher.matches(_info("sleep", create_time=time.time()), check_age=False)
+    assert "create_time" in matcher.attrs
+
+
+def test_process_matcher_validates_criteria():
+    with pytest.raises(ValueError):
+        os_util.ProcessMatcher()
+    with pytest.raises(ValueError):
+        os_util.ProcessMatcher(min_age=60)
+    with pytest.raises(ValueError):
+        os_util.kill_all(min_age=60, dry=True)
+    with pytest.raises(ValueError):
+        os_util.ProcessMatcher(names=[""])
+    with pytest.raises(TypeError):
+        os_util.ProcessMatcher(patterns=[1])
+
+
+def test_kill_all_matches_inline_flag_pattern(spawn_process_tree):
+    root = spawn_process_tree(depth=1, width=2)
+
+    victims = os_util.kill_all(pattern="(?i)SLEEP", ppid=root.pid, dry=True)
+
+    assert len(victims) == 2
+    assert {victim.name for victim in victims} == {"sleep"}
+
+
+_STAT_TAIL = b"S 42 100 100 0 -1 4194560 1 0 0 0 0 0 0 0 20 0 1 0 12345 1000 100 1844674407370955161"
+
+
+@pytest.mark.parametrize("name", ["sleep", "my proc", "a) (b", "(x)", "tab\there", ""])
+def test_proc_fs_parse_stat(name):
+    data = f"100 ({name}) ".encode() + _STAT_TAIL + b"\n"
+
+    parsed_name, fields = os_util._ProcFs._parse_stat(data)
+
+    assert parsed_name == name
+    assert fields[0] == b"S"
+    assert int(fields[1]) == 42
+    assert int(fields[19]) == 12345
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"sleep\x00600\x00", ["sleep", "600"]),
+    (b"nginx: worker process\x00", ["nginx:", "worker", "process"]),
+    (b"postgres: writer ", ["postgres:", "writer"]),
+    (b"", []),
+])
+def test_proc_fs_cmdline(monkeypatch, data, expected):
+    monkeypatch.setattr(os_util, "_read_file", lambda path: data)
+
+    assert os_util._ProcFs._get_cmdline(1) == expected
+
+
+@pytest.mark.skipif(not os_util._ProcFs.AVAILABLE, reason="no /proc filesystem")
+def test_proc_fs_matches_psutil(spawn_process_tree):
+    root = spawn_process_tree(depth=1, width=2)
+    process_pids = [root.pid] + [child.pid for child in psutil.Process(root.pid).children()]
+    attrs = ["cmdline", "create_time", "exe", "username"]
+
+    table = os_util.ProcessTable.snapshot(attrs, backend="proc", pids=process_pids)
+
+    assert sorted(table.pids) == sorted(process_pids)
+    for pid in process_pids:
+        expected = psutil.Process(pid).as_dict(["pid", "ppid", "name"] + attrs)
+        info = table.info(pid)
+        assert {key: info[key] for key in expected if key != "create_time"} == \
+            {key: value for key, value in expected.items() if key != "create_time"}
+        assert info["create_time"] == pytest.approx(expected["create_time"], abs=0.05)
+
+
+class _FakeProcesses:
+    """Stands in for the process table scans of a ProcessWatcher - a dict of pid -> info"""
+
+    def __init__(self, monkeypatch):
+        self.infos = dict()
+        self.killed = []
+        self.snapshots = []
+        monkeypatch.setattr(os_util.ProcessTable, "list_pids", lambda: list(self.infos))
+        monkeypatch.setattr(os_util.ProcessTable, "snapshot", self.snapshot)
+        monkeypatch.setattr(os_util, "_kill_trees", self.kill_trees)
+
+    def add(self, pid, create_time, name, ppid=1):
+        self.infos[pid] = dict(pid=pid, ppid=ppid, name=name, create_time=create_time)
+
+    def snapshot(self, attrs=(), backend=None, pids=None):
+        self.snapshots.append(sorted(pids))
+        return os_util.ProcessTable.from_infos([self.infos[pid] for pid in pids if pid in self.infos],
+                                               ["create_time"])
+
+    def kill_trees(self, table, pids, *, dry, timeout):
+        self.killed.append(sorted(info["pid"] for info in table))
+        return []
+
+
+def test_process_watcher_reads_only_new_and_pending_processes(monkeypatch):
+    processes = _FakeProcesses(monkeypatch)
+    watcher = os_util.ProcessWatcher(os_util.ProcessMatcher(names=["victim"], min_age=60))
+    for pid in range(100, 200):
+        processes.add(pid, 0.0, "idle")
+    processes.add(1000, time.time(), "victim")
+    watcher.tick()
+
+    processes.add(2000, 0.0, "idle")
+    watcher.tick()
+    watcher.tick()
+
+    assert processes.snapshots == [list(range(100, 200)) + [1000], [1000, 2000], [1000]]
+
+
+def test_process_watcher_treats_reused_pending_pid_as_new_process(monkeypatch):
+    processes = _FakeProcesses(monkeypatch)
+    watcher = os_util.ProcessWatcher(os_util.ProcessMatcher(names=["victim"], min_age=60))
+
+    # a victim too young to be killed is kept pending
+    processes.add(1000, time.time() - 30, "victim")
+    processes.add(1001, time.time() - 30, "child", ppid=1000)
+    watcher.tick()
+
+    # it exits and an unrelated process gets the same pid between two ticks - it must not be killed in its place
+    processes.infos.clear()
+    processes.add(1000, time.time() - 1, "innocent")
+    tick = watcher.tick()
+    assert (tick.new, tick.gone, tick.processes) == (0, 1, 1)
+
+    real_time = time.time
+    monkeypatch.setattr(os_util.time, "time", lambda: real_time() + 60)
+    watcher.tick()
+
+    assert processes.killed == []
+
+
+def test_process_watcher_kills_matching_subtree(monkeypatch):
+    processes = _FakeProcesses(monkeypatch)
+    watcher = os_util.ProcessWatcher(os_util.ProcessMatcher(names=["victim"]))
+
+    processes.add(2000, 0.0, "innocent")
+    processes.add(2001, 10.0, "child", ppid=2000)
+    watcher.tick()
+    del processes.infos[2000]
+    watcher.tick()
+    # pid 2000 is reused by a victim - the child of the previous owner is older than it and is not included
+    processes.add(2000, 20.0, "victim")
+    processes.add(2002, 30.0, "child", ppid=2000)
+    watcher.tick()
+
+    assert processes.killed == [[2000, 2002]]
+
+
+def test_kill_trees_skips_reused_pid(spawn_process_tree):
+    root = spawn_process_tree(depth=0, width=1)
+    info = dict(pid=root.pid, ppid=os.getpid(), name="sh", create_time=psutil.Process(root.pid).create_time() - 100)
+    table = os_util.ProcessTable.from_infos([info], ["create_time"])
+
+    victims = os_util._kill_trees(table, [root.pid], dry=False, timeout=1)
+
+    assert [victim.status for victim in victims] == ["GONE"]
+    assert root.poll() is None
+
+
+def test_process_watcher_kills_new_matching_processes(spawn_process_tree):
+    root = spawn_process_tree(depth=1, width=2)
+    watcher = os_util.ProcessWatcher(os_util.ProcessMatcher(names=["sleep"], ppid=root.pid), dry=False, timeout=2)
+
+    tick = watcher.tick()
+
+    assert sorted(victim.status for victim in tick.victims) == ["TERMINATED", "TERMINATED"]
+    # the root is not matched - it exits on its own once its children are gone
+    assert root.wait(timeout=10) == 0
+
+
+@pytest.mark.parametrize("args", [["-w", "5"], ["-w", "5", "-i"], ["-w", "5", "-a", "60"],
+                                  ["-w", "5", "-n", "sleep", "-pid", "1"]])
+def test_kill_all_cli_watch_rejects_invalid_args(args, capsys):
+    from hed_utils.cli import kill_all
+
+    with pytest.raises(SystemExit) as error:
+        kill_all.main(args)
+
+    assert error.value.code == 2
+    assert "--watch" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("args", [["-a", "60"], ["-a", "60", "-nd"], ["-a", "60", "-pid", "1"]])
+def test_kill_all_cli_rejects_min_age_alone(args, capsys):
+    from hed_utils.cli import kill_all
+
+    with pytest.raises(SystemExit) as error:
+        kill_all.main(args)
+
+    assert error.value.code == 2
+    assert "--min-age" in capsys.readouterr().err
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="the temp dir is per user already")
+def test_view_root_is_private_to_the_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    root = os_util._get_view_root()
+
+    assert root == tmp_path.joinpath(f"hed_utils_view_{os.getuid()}")
+    assert stat.S_IMODE(os.stat(root).st_mode) == 0o700
+    assert os_util._get_view_root() == root
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="the temp dir is per user already")
+def test_view_root_avoids_a_directory_others_can_access(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    taken = tmp_path.joinpath(f"hed_utils_view_{os.getuid()}")
+    taken.mkdir()
+    taken.chmod(0o777)
+
+    root = os_util._get_view_root()
+
+    assert root != taken and root.parent == tmp_path
+    assert stat.S_IMODE(os.stat(root).st_mode) == 0o700